@@ -0,0 +1,298 @@
+"""
+Aggregates over binary game logs (see eventlog), without decoding them to Python.
+
+Log files are memory-mapped as NumPy structured arrays, one element per RECORD,
+and read in chunks of CHUNK_RECORDS: memory stays flat whatever the size of the log.
+Every statistic is a vectorised group-by over the chunk, carried in a `LogStats`.
+LogStats of different shards merge by adding them up, so files can be scanned
+in parallel and their aggregates saved, then merged.
+
+Statistics come from the per round summaries of the log (PNL, POT, SETTLE) and
+from the orders: every order not taken is matched by the house. Summaries are only
+in logs recorded from TRACE_SUMMARY:
+
+    python tournament.py -p 5 -n 10000 --log sweep-0.log --summaries
+
+Requires NumPy, unlike the rest of the engine.
+
+    python analytics.py sweep-*.log -w 4 --save sweep.npz
+    python analytics.py --merge a.npz b.npz
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+import numpy as np
+
+from eventlog import RECORD
+from tracing import PNL, POST, POT, ROUND, SETTLE, START, TAKE
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("kind", "u1"),
+        ("player", "i1"),
+        ("other", "i1"),
+        ("card", "i1"),
+        ("value", "<i4"),
+    ]
+)
+"""Same layout as eventlog.RECORD"""
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+CHUNK_RECORDS = 1 << 22
+"""Records read at once, 32 MiB"""
+
+
+def open_log(path: str) -> np.ndarray:
+    """Records of the log file, memory-mapped. A record cut at the end is ignored"""
+    num_records = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    if num_records == 0:
+        return np.zeros(0, RECORD_DTYPE)
+    return np.memmap(path, RECORD_DTYPE, mode="r", shape=(num_records,))
+
+
+def add_padded(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Sum of two arrays of the same rank, the smaller one padded with zeros"""
+    shape = tuple(max(n, m) for n, m in zip(a.shape, b.shape))
+    total = np.zeros(shape, np.int64)
+    total[tuple(slice(n) for n in a.shape)] += a
+    total[tuple(slice(n) for n in b.shape)] += b
+    return total
+
+
+class LogStats:
+    """
+    Mergeable aggregates of logged games. Counts only, rates are computed from them.
+    Arrays are indexed by round of the game (round 0 is the deal), seat
+    and table size, and grow with the logs.
+    """
+
+    games: int
+    table_rounds: np.ndarray
+    """Rounds played per number of players at the table"""
+    round_games: np.ndarray
+    """Games that reached each round"""
+    pnl: np.ndarray
+    """Chips won per seat and round, summed over games"""
+    posts: int
+    takes: int
+    pot_sizes: np.ndarray
+    """Times the blind pot was paid, per pot size"""
+    pot_splits: np.ndarray
+    """Times the blind pot was paid, per number of players sharing it"""
+    paid: int
+    """Positions paid by the market"""
+    stonks: int
+    """Positions paid the stonk payout"""
+
+    def __repr__(self):
+        return f"[[LogStats games:{self.games}, rounds:{self.rounds}]]"
+
+    def __init__(self):
+        self.games = 0
+        self.table_rounds = np.zeros(0, np.int64)
+        self.round_games = np.zeros(0, np.int64)
+        self.pnl = np.zeros((0, 0), np.int64)
+        self.posts = 0
+        self.takes = 0
+        self.pot_sizes = np.zeros(0, np.int64)
+        self.pot_splits = np.zeros(0, np.int64)
+        self.paid = 0
+        self.stonks = 0
+
+    @property
+    def rounds(self) -> int:
+        return int(self.table_rounds.sum())
+
+    @property
+    def house_matches(self) -> int:
+        return self.posts - self.takes
+
+    def seat_rounds(self) -> np.ndarray:
+        """Rounds played per seat: every round of the tables it sits at"""
+        at_least = self.table_rounds[::-1].cumsum()[::-1]
+        return at_least[1:]
+
+    def mean_pnl(self) -> np.ndarray:
+        """Chips won per seat and round played"""
+        seats = len(self.pnl)
+        return self.pnl.sum(axis=1) / np.maximum(self.seat_rounds()[:seats], 1)
+
+    def house_match_rate(self) -> float:
+        """Share of the orders matched by the house"""
+        return self.house_matches / self.posts if self.posts else 0.0
+
+    def stonk_rate(self) -> float:
+        """Share of the paid positions paid the stonk payout"""
+        return self.stonks / self.paid if self.paid else 0.0
+
+    def pot_quantiles(self, quantiles: Iterable[float]) -> list[int]:
+        """Pot sizes at the given quantiles of the paid pots"""
+        cumulative = self.pot_sizes.cumsum()
+        if len(cumulative) == 0 or cumulative[-1] == 0:
+            return []
+        return [
+            int(np.searchsorted(cumulative, q * cumulative[-1])) for q in quantiles
+        ]
+
+    def scan(self, records: np.ndarray):
+        """
+        Adds the records of whole games, in log order. Streams over the records
+        a chunk at a time, carrying the round and table size of the game across chunks.
+        """
+        round, num_players = 0, 0
+        for start in range(0, len(records), CHUNK_RECORDS):
+            chunk = np.asarray(records[start : start + CHUNK_RECORDS])
+            round, num_players = self.__add_chunk(chunk, round, num_players)
+
+    def __add_chunk(
+        self, chunk: np.ndarray, carry_round: int, carry_players: int
+    ) -> tuple[int, int]:
+        kind = chunk["kind"]
+        player = chunk["player"].astype(np.int64)
+        other = chunk["other"].astype(np.int64)
+        value = chunk["value"].astype(np.int64)
+
+        """Round and table size of each record, from the last START before it"""
+        is_start = kind == START
+        is_round = kind == ROUND
+        rounds = np.cumsum(is_round, dtype=np.int64)
+        last_start = np.maximum.accumulate(
+            np.where(is_start, np.arange(len(chunk)), -1)
+        )
+        in_game = last_start >= 0
+        round = rounds - np.where(in_game, rounds[last_start], -carry_round)
+        num_players = np.where(in_game, other[last_start], carry_players)
+
+        self.games += int(is_start.sum())
+        self.table_rounds = add_padded(
+            self.table_rounds, np.bincount(num_players[is_round])
+        )
+        self.round_games = add_padded(self.round_games, np.bincount(round[is_round]))
+
+        is_pnl = kind == PNL
+        if is_pnl.any():
+            seats = int(player[is_pnl].max()) + 1
+            width = int(round[is_pnl].max()) + 1
+            pnl = np.bincount(
+                player[is_pnl] * width + round[is_pnl],
+                weights=value[is_pnl],
+                minlength=seats * width,
+            )
+            pnl = np.rint(pnl).astype(np.int64).reshape(seats, width)
+            self.pnl = add_padded(self.pnl, pnl)
+
+        self.posts += int(np.count_nonzero(kind == POST))
+        self.takes += int(np.count_nonzero(kind == TAKE))
+
+        is_pot = kind == POT
+        self.pot_sizes = add_padded(self.pot_sizes, np.bincount(value[is_pot]))
+        self.pot_splits = add_padded(self.pot_splits, np.bincount(other[is_pot]))
+
+        is_settle = kind == SETTLE
+        self.paid += int(other[is_settle].sum())
+        self.stonks += int(value[is_settle].sum())
+
+        if len(chunk) == 0:
+            return carry_round, carry_players
+        return int(round[-1]), int(num_players[-1])
+
+    def merge(self, other: "LogStats") -> "LogStats":
+        """Adds the aggregates of another shard into these"""
+        self.games += other.games
+        self.table_rounds = add_padded(self.table_rounds, other.table_rounds)
+        self.round_games = add_padded(self.round_games, other.round_games)
+        self.pnl = add_padded(self.pnl, other.pnl)
+        self.posts += other.posts
+        self.takes += other.takes
+        self.pot_sizes = add_padded(self.pot_sizes, other.pot_sizes)
+        self.pot_splits = add_padded(self.pot_splits, other.pot_splits)
+        self.paid += other.paid
+        self.stonks += other.stonks
+        return self
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            counts=np.array(
+                [self.games, self.posts, self.takes, self.paid, self.stonks]
+            ),
+            table_rounds=self.table_rounds,
+            round_games=self.round_games,
+            pnl=self.pnl,
+            pot_sizes=self.pot_sizes,
+            pot_splits=self.pot_splits,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LogStats":
+        stats = cls()
+        with np.load(path) as data:
+            counts = [int(n) for n in data["counts"]]
+            stats.games, stats.posts, stats.takes, stats.paid, stats.stonks = counts
+            stats.table_rounds = data["table_rounds"]
+            stats.round_games = data["round_games"]
+            stats.pnl = data["pnl"]
+            stats.pot_sizes = data["pot_sizes"]
+            stats.pot_splits = data["pot_splits"]
+        return stats
+
+    def report(self) -> str:
+        rounds = max(self.rounds, 1)
+        lines = [
+            f"Games {self.games}, rounds {self.rounds}",
+            f"House matches {self.house_matches}, {self.house_matches / rounds:.3f}"
+            f" per round, {self.house_match_rate():.3f} of the orders",
+            f"Positions paid {self.paid}, stonks {self.stonks},"
+            f" stonk rate {self.stonk_rate():.4f}",
+            f"Blind pots paid {int(self.pot_sizes.sum())},"
+            f" size quartiles {self.pot_quantiles((0.25, 0.5, 0.75))},"
+            f" largest {len(self.pot_sizes) - 1}",
+        ]
+        for seat, pnl in enumerate(self.mean_pnl()):
+            lines.append(
+                f"  Seat {seat}: PnL {int(self.pnl[seat].sum())},"
+                f" {pnl:.3f} per round"
+            )
+        return "\n".join(lines)
+
+
+def scan_log(path: str) -> LogStats:
+    stats = LogStats()
+    stats.scan(open_log(path))
+    return stats
+
+
+def scan_logs(paths: list[str], workers: int | None = None) -> LogStats:
+    """Scans shard files in parallel processes, and merges their aggregates"""
+    stats = LogStats()
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            stats.merge(scan_log(path))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard in pool.map(scan_log, paths):
+            stats.merge(shard)
+    return stats
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Aggregates binary game logs")
+    parser.add_argument("paths", nargs="*", help="event log files, see eventlog")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--merge", nargs="*", default=[], help="aggregates saved by --save"
+    )
+    parser.add_argument("--save", default=None, help="saves the aggregates (.npz)")
+    args = parser.parse_args()
+
+    stats = scan_logs(args.paths, args.workers)
+    for path in args.merge:
+        stats.merge(LogStats.load(path))
+    print(stats.report())
+    if args.save:
+        stats.save(args.save)
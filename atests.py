@@ -1,5 +1,16 @@
-from card import CARDS
-from position import Position, flat_positions
+from card import LONGS, NUM_CARDS, Card
+from orderbook import Orderbook
+from position import Position, PositionBook
+
+
+CHECK_OFF = 0
+"""No invariant checks, for headless sweeps"""
+CHECK_SAMPLED = 1
+"""Full checks, only every `check_every` rounds"""
+CHECK_INCREMENTAL = 2
+"""O(1) checks every round and action, against the counts kept by a Ledger"""
+CHECK_FULL = 3
+"""Full checks every round and action, for debugging runs"""
 
 
 def Ok(ok: bool, msg: str = ""):
@@ -7,41 +18,125 @@ def Ok(ok: bool, msg: str = ""):
     assert ok, msg
 
 
+class Ledger:
+    """
+    Counts cards as they move, so the game's invariants can be checked in O(1).
+    The engine reports every move, see `deal`, `play`, `post`, etc.
+    """
+
+    held: list[int]
+    """
+    Cards at play per player_id, like `players_limited_cards` counts them:
+    cards in hand, cards in the orderbook and one per position
+    """
+
+    loose: int
+    """Cards out of the deck and the discarded pile"""
+
+    touched: set[int]
+    """player_ids whose count changed since the last `limited_cards`"""
+
+    def __init__(self, num_players: int):
+        self.held = [0] * num_players
+        self.loose = 0
+        self.touched = set()
+
+    def copy(self) -> "Ledger":
+        clone = Ledger(0)
+        clone.held = self.held.copy()
+        clone.loose = self.loose
+        clone.touched = self.touched.copy()
+        return clone
+
+    def deal(self, player_id: int, num: int = 1):
+        """Cards drawn from the deck to a hand"""
+        self.held[player_id] += num
+        self.loose += num
+        self.touched.add(player_id)
+
+    def play(self, player_id: int, num: int = 1):
+        """Cards leave the hand, to the orderbook or to a position"""
+        self.held[player_id] -= num
+        self.touched.add(player_id)
+
+    def discard(self, player_id: int, num: int = 1):
+        """Cards leave the hand, to the discarded pile"""
+        self.held[player_id] -= num
+        self.loose -= num
+        self.touched.add(player_id)
+
+    def post(self, player_id: int):
+        """A card enters the orderbook"""
+        self.held[player_id] += 1
+        self.touched.add(player_id)
+
+    def unpost(self, player_id: int):
+        """A card leaves the orderbook, to a position"""
+        self.held[player_id] -= 1
+        self.touched.add(player_id)
+
+    def open(self, position: Position):
+        for player_id in (position.long, position.short):
+            if player_id != -1:
+                self.held[player_id] += 1
+                self.touched.add(player_id)
+
+    def close(self, position: Position):
+        """The position and its cards go to the discarded pile"""
+        for player_id in (position.long, position.short):
+            if player_id != -1:
+                self.held[player_id] -= 1
+                self.touched.add(player_id)
+        self.loose -= len(position.cards)
+
+    def limited_cards(self, Chips: list[int], CARDS_PER_PLAYER: int) -> bool:
+        """Same check as `players_limited_cards`, only for the players that moved"""
+        for player_id in self.touched:
+            num = self.held[player_id]
+            if Chips[player_id] > 0 and num != CARDS_PER_PLAYER:
+                assert False, f"Main Error: player {player_id} has {num} cards"
+        self.touched.clear()
+        return True
+
+    def card_number(self, Deck: list[Card], Discarded: list[Card]) -> bool:
+        """Same check as `game_card_number`"""
+        Ok(
+            self.loose + len(Deck) + len(Discarded) == NUM_CARDS,
+            "Main Error: game's cards",
+        )
+        return True
+
+
 def players_limited_cards(
-    Positions: list[Position],
-    Hands: list[list[str]],
+    Positions: PositionBook,
+    Hands: list[list[Card]],
     Chips: list[int],
-    Orderbook: dict[int, list[str]],
+    Orderbook: Orderbook,
     CARDS_PER_PLAYER: int,
 ) -> bool:
     for player_id, hand in enumerate(Hands):
         if Chips[player_id] <= 0:
             continue
         num = len([c for c in hand])
-        num += len(["1" for p in Positions if p.has_player(player_id)])
-        num += len(Orderbook.get(player_id, []))
+        num += Positions.count(player_id)
+        num += Orderbook.count(player_id)
         if num != CARDS_PER_PLAYER:
             assert False, f"Main Error: player {player_id} has {num} cards"
     return True
 
 
 def game_card_number(
-    Positions: list[Position],
-    Hands: list[list[str]],
-    Deck: list[str],
-    Discarded: list[str],
+    Positions: PositionBook,
+    Hands: list[list[Card]],
+    Deck: list[Card],
+    Discarded: list[Card],
 ) -> bool:
-    Ok(
-        len(
-            flat_positions(Positions) + [c for h in Hands for c in h] + Deck + Discarded
-        )
-        == len(CARDS),
-        "Main Error: game's cards",
-    )
+    num = sum(len(p.cards) for p in Positions) + sum(len(h) for h in Hands)
+    Ok(num + len(Deck) + len(Discarded) == NUM_CARDS, "Main Error: game's cards")
     return True
 
 
-def test_strategy(new_cards: list[str], hand: list[str]) -> bool:
+def test_strategy(new_cards: list[Card], hand: list[Card]) -> bool:
     Ok(
         len([c for c in new_cards if c not in hand]) == 0,
         "Strategy Error: card(s) not in hand",
@@ -50,3 +145,127 @@ def test_strategy(new_cards: list[str], hand: list[str]) -> bool:
     Ok(len(new_cards) == len(set(new_cards)), "Strategy Error: repeated cards")
 
     return True
+
+
+def test_set_actions() -> bool:
+    """
+    `Strategy.set_actions` only takes another player's order of the other colour:
+    a same-colour take would open a position valued 0
+    """
+    from strategy import Strategy
+
+    longs = [card for card in range(NUM_CARDS) if LONGS[card]]
+    shorts = [card for card in range(NUM_CARDS) if not LONGS[card]]
+    book = Orderbook()
+    book.post(1, longs[1])
+    book.post(0, shorts[1])
+    book.post(1, shorts[2])
+    strategy = Strategy(0, [], False, False)
+
+    for order_card in (longs[1], shorts[1]):
+        """Same colour, then my own order"""
+        strategy.hand = [longs[0]]
+        try:
+            strategy.set_actions([(longs[0], order_card)], [], PositionBook(), book)
+        except ValueError as error:
+            Ok("No order of the other colour" in str(error), str(error))
+        else:
+            Ok(False, f"Test Error: take of {order_card} accepted")
+
+    strategy.hand = [longs[0]]
+    Ok(
+        strategy.set_actions([(longs[0], shorts[2])], [], PositionBook(), book),
+        "Test Error: valid take refused",
+    )
+    Ok(strategy.open_cards == {longs[0]: book.get(shorts[2])}, "Test Error: take")
+    return True
+
+
+
+def test_server_take() -> bool:
+    """
+    A client of `server.py` taking an order of its own colour gets an error reply.
+    Plays a 2 players table with one human seat, over TCP
+    """
+    import asyncio
+    import json
+
+    from card import CARD_IDS
+    from server import GameServer
+
+    async def play() -> str | None:
+        server = GameServer()
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        def send(message: dict):
+            writer.write(json.dumps(message).encode() + b"\n")
+
+        send({"op": "create", "players": 2, "chips": 100, "humans": 1, "seed": 1})
+        table = json.loads(await reader.readline())["table"]
+        send({"op": "join", "table": table, "seat": 0})
+        error = None
+        is_taking = False
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message.get("event") == "end":
+                break
+            elif is_taking and "error" in message:
+                error = message["error"]
+                break
+            elif message.get("event") == "turn":
+                take = next(
+                    (
+                        {"card": card, "take": order["card"]}
+                        for order in message["orderbook"]
+                        for card in message["hand"]
+                        if order["player"] != 0
+                        and LONGS[CARD_IDS[card]] == LONGS[CARD_IDS[order["card"]]]
+                    ),
+                    None,
+                )
+                is_taking = take is not None
+                send({"op": "act", "table": table, "open": [take] if take else []})
+        writer.close()
+        listener.close()
+        return error
+
+    error = asyncio.run(play())
+    Ok(error is not None, "Test Error: no same-colour take, or it was accepted")
+    Ok("No order of the other colour" in error, error)
+    return True
+
+
+
+def test_early_stop() -> bool:
+    """
+    A tournament stopped after its first game doesn't wait for the window of games
+    in flight (4 per worker): it takes well under the time of playing them
+    """
+    from time import perf_counter
+
+    from tournament import StoppingRule, game_seeds, play_seeded, run_tournament
+
+    workers = 4
+    start = perf_counter()
+    for seed in game_seeds(0, workers * 4):
+        play_seeded(5, 2000, seed, CHECK_OFF)
+    window = perf_counter() - start
+
+    start = perf_counter()
+    stop = StoppingRule(0, half_width=0.5, min_games=1)
+    summary = run_tournament(5, 2000, 1000, 0, workers, CHECK_OFF, stop=stop)
+    elapsed = perf_counter() - start
+    Ok(summary.games == 1, f"Test Error: stopped after {summary.games} games")
+    Ok(
+        elapsed < window / 2,
+        f"Test Error: stopped in {elapsed:.2f}s, the window plays in {window:.2f}s",
+    )
+    return True
+
+if __name__ == "__main__":
+    test_set_actions()
+    test_server_take()
+    test_early_stop()
+    print("ok")
@@ -0,0 +1,248 @@
+"""
+Benchmarks for the engine's hot paths.
+
+- Micro benchmarks time single calls on a seeded mid-game state, in ns per call.
+- Macro benchmarks play whole seeded games, in games and rounds per second.
+
+Results can be saved as JSON and compared against a stored baseline:
+
+    python bench.py --save baseline.json
+    python bench.py --compare baseline.json
+"""
+
+import json
+import platform
+from time import perf_counter, perf_counter_ns
+from typing import Callable
+
+from card import NUM_CARDS
+from game import (
+    GameState,
+    close_positions,
+    gameloop,
+    is_playing,
+    match_algo_house,
+    new_game,
+    play_round,
+)
+from evtable import EV_TABLE
+from odds import Odds
+from position import flat_positions, get_payout_size, get_value_position
+from strategy import Strategy
+from tournament import game_seeds
+
+BENCH_SEED = 1234
+MACRO_PLAYERS = [2, 5, 7]
+MACRO_GAMES = 200
+INIT_CHIPS = 100
+
+
+def mid_game(
+    num_players: int = 7, rounds: int = 4, seed: int = BENCH_SEED
+) -> GameState:
+    """A seeded state a few rounds into the game, with positions and hands at play"""
+    state = new_game(num_players, INIT_CHIPS, play=False, seed=seed)
+    while state.current_round < rounds and is_playing(state):
+        play_round(state)
+    return state
+
+
+def open_orderbook(state: GameState) -> GameState:
+    """Runs the market open of the next round, leaving the orderbook unmatched"""
+    for player_id in range(state.total_players):
+        if state.Hands[player_id]:
+            state.Orderbook.post(player_id, state.Hands[player_id].pop())
+    return state
+
+
+def time_calls(
+    fn: Callable, setup: Callable[[], tuple], number: int, repeat: int = 5
+) -> float:
+    """
+    Best of `repeat` runs of the mean ns per call of `fn(*setup())`.
+    `setup` runs before every call and is not timed, so `fn` may mutate its arguments.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        total = 0
+        for _ in range(number):
+            args = setup()
+            t = perf_counter_ns()
+            fn(*args)
+            total += perf_counter_ns() - t
+        best = min(best, total / number)
+    return best
+
+
+def time_loop(fn: Callable, args: tuple, number: int, repeat: int = 5) -> float:
+    """Best of `repeat` runs of the mean ns per call of `fn(*args)`, for pure fns"""
+    best = float("inf")
+    for _ in range(repeat):
+        t = perf_counter_ns()
+        for _ in range(number):
+            fn(*args)
+        best = min(best, (perf_counter_ns() - t) / number)
+    return best
+
+
+def micro_benchmarks(number: int = 2000) -> dict[str, float]:
+    """ns per call of each hot path"""
+    state = mid_game()
+    positions = state.Positions
+    position = max(positions, key=lambda p: len(p.cards))
+    market_card = NUM_CARDS - 1
+    strategy = state.Strategies[1]
+    throwaway = Strategy(1, state.Hands[1], is_agent=False, playing=False)
+    results = {}
+
+    results["get_value_position"] = time_loop(get_value_position, (position,), number)
+    results["get_payout_size"] = time_loop(
+        get_payout_size, (position, market_card), number
+    )
+    results["flat_positions"] = time_loop(flat_positions, (positions,), number)
+    results["Strategy.update_state"] = time_loop(
+        throwaway.update_state, ([market_card],), number
+    )
+    results["Odds"] = time_loop(Odds, (strategy.composition,), number)
+    results["EvTable.payouts"] = time_loop(
+        EV_TABLE.payouts, (strategy.composition,), number
+    )
+    results["GameState.fork"] = time_loop(state.fork, (state.rng,), number)
+    results["GameState.snapshot"] = time_loop(state.snapshot, (), number)
+
+    def compute_setup():
+        return (
+            state.Hands[1].copy(),
+            state.Positions,
+            state.Chips,
+            state.Orderbook,
+            state.Blinds,
+        )
+
+    results["Strategy.compute_current_action"] = time_calls(
+        strategy.compute_current_action, compute_setup, number
+    )
+
+    def close_setup():
+        fresh = mid_game()
+        return fresh, next(iter(fresh.Positions)), None, -1
+
+    results["close_positions"] = time_calls(close_positions, close_setup, number // 10)
+
+    def match_setup():
+        return (open_orderbook(mid_game()),)
+
+    results["match_algo_house"] = time_calls(
+        match_algo_house, match_setup, number // 10
+    )
+
+    return results
+
+
+def macro_benchmarks(games: int = MACRO_GAMES) -> dict[str, dict[str, float]]:
+    """Games and rounds per second, playing seeded headless games serially"""
+    results = {}
+    for num_players in MACRO_PLAYERS:
+        seeds = game_seeds(BENCH_SEED, games)
+        rounds = 0
+        t = perf_counter()
+        for seed in seeds:
+            rounds += gameloop(new_game(num_players, INIT_CHIPS, False, seed))[1]
+        elapsed = perf_counter() - t
+        results[f"players_{num_players}"] = {
+            "games_per_sec": games / elapsed,
+            "rounds_per_sec": rounds / elapsed,
+            "rounds": rounds,
+        }
+    return results
+
+
+def run_benchmarks(number: int = 2000, games: int = MACRO_GAMES) -> dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": BENCH_SEED,
+        },
+        "micro": micro_benchmarks(number),
+        "macro": macro_benchmarks(games),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.1) -> list[str]:
+    """
+    Returns the regressions against the baseline, as printable lines.
+    Micro results regress if they take more ns per call by more than `tolerance`,
+    macro results if they play fewer games or rounds per second.
+    """
+    regressions = []
+    for name, ns in results["micro"].items():
+        base = baseline.get("micro", {}).get(name)
+        if base and ns > base * (1 + tolerance):
+            regressions.append(f"micro {name}: {base:.0f}ns -> {ns:.0f}ns")
+
+    for name, rates in results["macro"].items():
+        for rate in ["games_per_sec", "rounds_per_sec"]:
+            base = baseline.get("macro", {}).get(name, {}).get(rate)
+            if base and rates[rate] < base * (1 - tolerance):
+                regressions.append(
+                    f"macro {name} {rate}: {base:.1f} -> {rates[rate]:.1f}"
+                )
+    return regressions
+
+
+def report(results: dict, baseline: dict | None = None) -> str:
+    lines = ["Micro benchmarks (ns per call):"]
+    for name, ns in results["micro"].items():
+        line = f"  {name:<34}{ns:>12.0f}"
+        if baseline and (base := baseline.get("micro", {}).get(name)):
+            line += f"  ({ns / base - 1:+.1%})"
+        lines.append(line)
+
+    lines.append("Macro benchmarks:")
+    for name, rates in results["macro"].items():
+        line = (
+            f"  {name:<12}{rates['games_per_sec']:>10.1f} games/s"
+            f"{rates['rounds_per_sec']:>12.1f} rounds/s"
+        )
+        if baseline and (base := baseline.get("macro", {}).get(name)):
+            line += f"  ({rates['games_per_sec'] / base['games_per_sec'] - 1:+.1%})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmarks the engine's hot paths")
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--number", type=int, default=2000, help="calls per micro")
+    parser.add_argument(
+        "--games", type=int, default=MACRO_GAMES, help="games per macro"
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.number, args.games)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(report(results, baseline))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("No regressions")
@@ -53,41 +53,75 @@ CARDS = [
     "Kh",
 ]
 """
-Sorted array of cards:
-- value = `CARDS[n][0]`: A-K, T=10
-- suit = `CARDS[n][1]`: s:spades, c:clubs, d:diamond, h:heart
+Sorted array of card names, used to print and parse cards.
+A card is an int `n` in `range(52)`, and its name is `CARDS[n]`:
+- rank = `n // 4`: A-K, T=10
+- suit = `n % 4`: s:spades, c:clubs, d:diamond, h:heart
 """
 
+Card = int
+"""A card is an int in range(52), see CARDS for its name"""
 
-def get_value(card: str) -> int:
+NUM_CARDS = len(CARDS)
+
+VALUES: list[int] = [min(n // 4 + 1, 10) for n in range(NUM_CARDS)]
+"""Numerical value per card. Face cards are worth 10."""
+
+LONGS: list[bool] = [n % 4 < 2 for n in range(NUM_CARDS)]
+"""Color per card: True if black (long), False if red (short)"""
+
+BIGS: list[bool] = [n // 4 >= 6 for n in range(NUM_CARDS)]
+"""Size per card: True if big (7-K), False if small (A-6)"""
+
+FACES: list[bool] = [n // 4 >= 10 for n in range(NUM_CARDS)]
+"""True if card is a face: `J, Q, K`"""
+
+SMALL, BIG, FACE = 0, 1, 2
+"""Size classes of cards (and positions): `A-6`, `7-T` and `J-K`"""
+
+SIZES: list[int] = [
+    FACE if FACES[n] else BIG if BIGS[n] else SMALL for n in range(NUM_CARDS)
+]
+"""Size class per card"""
+
+NUM_KINDS = 6
+KINDS: list[int] = [3 * LONGS[n] + SIZES[n] for n in range(NUM_CARDS)]
+"""Kind per card, its color and size class: `3 * is_long + size`, in range(NUM_KINDS)"""
+
+CARD_IDS: dict[str, Card] = {name: n for n, name in enumerate(CARDS)}
+"""Maps card name to card, see `parse_card`"""
+
+
+def card_str(card: Card) -> str:
+    """Name of the card, 2 chars. See CARDS"""
+    return CARDS[card]
+
+
+def cards_str(cards) -> list[str]:
+    """Names of a collection of cards, for the UI and logs"""
+    return [CARDS[c] for c in cards]
+
+
+def parse_card(name: str) -> Card | None:
+    """Card from its name, None if the name is not a card"""
+    return CARD_IDS.get(name)
+
+
+def get_value(card: Card) -> int:
     """Numerical value of card. Face cards are worth 10."""
-    return {
-        "A": 1,
-        "2": 2,
-        "3": 3,
-        "4": 4,
-        "5": 5,
-        "6": 6,
-        "7": 7,
-        "8": 8,
-        "9": 9,
-        "T": 10,
-        "J": 10,
-        "Q": 10,
-        "K": 10,
-    }[card[0]]
-
-
-def is_big(card: str) -> bool:
+    return VALUES[card]
+
+
+def is_big(card: Card) -> bool:
     """Is card big or small. Returns 1 if big, 0 if small."""
-    return card[0] in ["7", "8", "9", "T", "J", "Q", "K"]
+    return BIGS[card]
 
 
-def is_long(card: str) -> bool:
+def is_long(card: Card) -> bool:
     """Is card long or short. Returns 1 if long, 0 if short."""
-    return card[1] in ["s", "c"]
+    return LONGS[card]
 
 
-def is_face(card: str) -> bool:
+def is_face(card: Card) -> bool:
     """Is card a face: `J, Q, K`"""
-    return card[0] in ["J", "Q", "K"]
+    return FACES[card]
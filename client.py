@@ -0,0 +1,187 @@
+"""
+Terminal client of the game server, see server.py.
+
+Prints what happens at the tables it sits or watches at, and asks for your actions
+when it's your turn. Commands, at any time:
+    list                         tables of the server
+    create [players] [humans]    opens a table
+    join TABLE SEAT
+    watch TABLE
+    leave TABLE
+During a turn:
+    open CARD [ORDER_CARD]       makes an order, or takes the order of ORDER_CARD
+    double CARD POSITION         doubles down on the position with the card
+    close POSITION [CARD ...]    closes with the cards, or with chips
+    review, reset
+    ok                           sends your actions (none passes)
+
+    python client.py --create 5 --port 7373
+    python client.py --join 0 2 --unix /tmp/stonks.sock
+"""
+
+import asyncio
+import json
+import sys
+from threading import Thread
+
+from strategy import print_welcome
+
+
+class Client:
+    writer: asyncio.StreamWriter
+    lines: asyncio.Queue
+    """Lines typed by the user"""
+    turn: dict | None
+    """The turn waiting for an answer, if any"""
+    actions: dict
+    """The pending answer to the turn: open and close actions"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.lines = asyncio.Queue()
+        self.turn = None
+        self.actions = {"open": [], "close": []}
+
+    async def send(self, request: dict):
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self, reader: asyncio.StreamReader):
+        while line := await reader.readline():
+            self.show(json.loads(line))
+        print("Disconnected")
+
+    def show(self, message: dict):
+        event = message.get("event")
+        if event == "trace":
+            print(f"[{message['table']}] {message['text']}")
+        elif event == "turn":
+            self.turn = message
+            self.actions = {"open": [], "close": []}
+            print_turn(message)
+        elif event == "end":
+            print(f"[{message['table']}] Game finished", message.get("chips", ""))
+            if "error" in message:
+                print(message["error"])
+        elif "error" in message:
+            print("Error:", message["error"])
+            if self.turn and message.get("table") == self.turn["table"]:
+                """The turn is asked again"""
+                self.actions = {"open": [], "close": []}
+        elif message.get("ok") == "list":
+            for table in message["tables"]:
+                print(table)
+        else:
+            print(message)
+
+    async def command(self, line: str):
+        words = line.split()
+        if not words:
+            return
+        match words:
+            case ["list"]:
+                await self.send({"op": "list"})
+            case ["create", *counts]:
+                counts = [int(n) for n in counts]
+                players = counts[0] if counts else 5
+                humans = counts[1] if len(counts) > 1 else 1
+                await self.send({"op": "create", "players": players, "humans": humans})
+            case ["join", table, seat]:
+                await self.send({"op": "join", "table": int(table), "seat": int(seat)})
+            case ["watch" | "leave" as op, table]:
+                await self.send({"op": op, "table": int(table)})
+            case ["open", card, *order] if self.turn:
+                take = order[0] if order else None
+                self.actions["open"].append({"card": card, "take": take})
+            case ["double", card, position] if self.turn:
+                double = {"card": card, "double": int(position)}
+                self.actions["open"].append(double)
+            case ["close", position, *cards] if self.turn:
+                close = {"position": int(position), "cards": cards or None}
+                self.actions["close"].append(close)
+            case ["review"] if self.turn:
+                print(self.actions)
+            case ["reset"] if self.turn:
+                self.actions = {"open": [], "close": []}
+            case ["ok"] if self.turn:
+                table = self.turn["table"]
+                self.turn = None
+                await self.send({"op": "act", "table": table, **self.actions})
+            case ["welcome"]:
+                print_welcome()
+            case _:
+                print(__doc__)
+
+    async def run(self):
+        while True:
+            line = await self.lines.get()
+            if line is None:
+                return
+            try:
+                await self.command(line)
+            except ValueError as error:
+                print("Error:", error)
+
+
+def print_turn(turn: dict):
+    print()
+    print(f"[{turn['table']}] Round {turn['round']}, your turn as seat {turn['seat']}")
+    print(f"  Count {turn['count']}, odds up {turn['odds']['up']:.3f}")
+    print("  Hand", turn["hand"])
+    print("  Chips", turn["chips"], "Blinds", turn["blinds"])
+    print("  Orderbook", [(o["player"], o["card"]) for o in turn["orderbook"]])
+    for p in turn["positions"]:
+        print(f"  Position {p['id']}: L:{p['long']} S:{p['short']} {p['cards']}")
+    print("Type open, close, review, reset, then ok")
+
+
+def read_stdin(lines: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+    """Reads the terminal in its own thread, the loop keeps receiving meanwhile"""
+    for line in sys.stdin:
+        loop.call_soon_threadsafe(lines.put_nowait, line.strip())
+    loop.call_soon_threadsafe(lines.put_nowait, None)
+
+
+async def main(args):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    client = Client(writer)
+
+    if args.create:
+        await client.send({"op": "create", "players": args.create, "humans": 1})
+        created = json.loads(await reader.readline())
+        if "error" in created:
+            sys.exit(created["error"])
+        args.join = [created["table"], 0]
+    if args.join:
+        table, seat = args.join
+        await client.send({"op": "join", "table": table, "seat": seat})
+    elif args.watch is not None:
+        await client.send({"op": "watch", "table": args.watch})
+
+    receiving = asyncio.create_task(client.receive(reader))
+    loop = asyncio.get_running_loop()
+    Thread(target=read_stdin, args=(client.lines, loop), daemon=True).start()
+    running = asyncio.create_task(client.run())
+    await asyncio.wait({receiving, running}, return_when=asyncio.FIRST_COMPLETED)
+    writer.close()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Plays at the tables of server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7373)
+    parser.add_argument("--unix", default=None, help="Unix socket path, not TCP")
+    parser.add_argument("--create", type=int, default=None, help="players")
+    parser.add_argument("--join", type=int, nargs=2, default=None)
+    parser.add_argument("--watch", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
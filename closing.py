@@ -0,0 +1,70 @@
+"""
+Cards to close a position with. README rule: the cards must be of the color
+opposite to the player's side and add up to at least the position's value,
+or be a single Ace, which closes any position.
+"""
+
+from functools import lru_cache
+
+from card import LONGS, VALUES, Card
+from position import Position
+
+
+@lru_cache(maxsize=None)
+def subset_table(values: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    Cheapest subset of cards reaching each target, for the sorted values of cards:
+    entry t is the bitmask (bit i for values[i]) with the smallest sum >= t,
+    then the fewest cards. Entries go up to sum(values), higher targets can't close.
+    A hand has few distinct multisets of values, so every one is computed once.
+    """
+    sums = [0] * (1 << len(values))
+    for mask in range(1, len(sums)):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + values[low.bit_length() - 1]
+
+    table = [0] * (sums[-1] + 1)
+    reached = 0
+    for mask in sorted(range(len(sums)), key=lambda m: (sums[m], m.bit_count())):
+        """Masks by sum then size: the first one over a target is its cheapest"""
+        while reached < sums[mask]:
+            reached += 1
+            table[reached] = mask
+    return tuple(table)
+
+
+def closing_cards(
+    hand: list[Card], position: Position, player_id: int
+) -> list[Card] | None:
+    """
+    Cheapest cards of the hand that close the player's position: the fewest high
+    cards of the right color, an Ace only if they can't. None if nothing closes it.
+    Aces are kept out of the sums, an Ace alone closes anyway.
+    """
+    is_long = position.is_player_long(player_id)
+    cards = sorted(
+        (card for card in hand if LONGS[card] != is_long and VALUES[card] > 1),
+        key=VALUES.__getitem__,
+    )
+    table = subset_table(tuple(VALUES[card] for card in cards))
+    if 0 < position.value < len(table):
+        mask = table[position.value]
+        return [card for i, card in enumerate(cards) if mask >> i & 1]
+
+    for card in hand:
+        if VALUES[card] == 1:
+            return [card]
+    return None
+
+
+def is_closing(cards: list[Card], position: Position, player_id: int) -> bool:
+    """Do the cards close the player's position, see the README rule"""
+    if len(cards) == 1 and VALUES[cards[0]] == 1:
+        return True
+    is_long = position.is_player_long(player_id)
+    total = 0
+    for card in cards:
+        if LONGS[card] == is_long:
+            return False
+        total += VALUES[card]
+    return total >= position.value > 0
@@ -0,0 +1,158 @@
+from random import Random
+from typing import Callable, Iterable
+
+from card import NUM_CARDS, Card
+
+
+def reshuffle_when_empty(deck: "Deck") -> bool:
+    """README rule: if the deck runs out, re-shuffle the discarded pile"""
+    return len(deck.cards) == 0
+
+
+def reshuffle_below(cards_left: int) -> Callable[["Deck"], bool]:
+    """Reshuffles the discarded pile back into the deck once it has few cards left"""
+
+    def policy(deck: "Deck") -> bool:
+        return len(deck.cards) < cards_left and len(deck.discarded) > 0
+
+    return policy
+
+
+class PermutationBuffer:
+    """
+    Pre-generated permutations of range(NUM_CARDS), drawn from a seeded rng in batches.
+    Any number of cards can be shuffled with one: keeping the entries smaller than
+    the number of cards, in order, yields a uniform permutation of those cards.
+    The sequence of shuffles then only depends on the seed, not on the size of the deck.
+    """
+
+    rng: Random
+    batch: int
+    permutations: list[list[int]]
+
+    def __init__(self, rng: Random, batch: int = 64):
+        self.rng = rng
+        self.batch = batch
+        self.permutations = []
+
+    def copy(self, rng: Random) -> "PermutationBuffer":
+        """Same permutations left, the next batches are drawn from `rng`"""
+        clone = PermutationBuffer(rng, self.batch)
+        clone.permutations = self.permutations.copy()
+        return clone
+
+    def __fill(self):
+        base = list(range(NUM_CARDS))
+        for _ in range(self.batch):
+            permutation = base.copy()
+            self.rng.shuffle(permutation)
+            self.permutations.append(permutation)
+        self.permutations.reverse()
+
+    def shuffle(self, cards: list[Card]):
+        """Shuffles the cards in place, with the next permutation"""
+        if not self.permutations:
+            self.__fill()
+        num = len(cards)
+        order = self.permutations.pop()
+        if num < NUM_CARDS:
+            order = [i for i in order if i < num]
+        cards[:] = [cards[i] for i in order]
+
+
+class Deck:
+    """
+    Cards to draw from, and the discarded pile they are reshuffled from.
+    When to reshuffle is up to the `policy`, the deck is always reshuffled if empty.
+    """
+
+    cards: list[Card]
+    """Draw from the end of the list"""
+
+    discarded: list[Card]
+    """Discarded cards, useful for reshuffling"""
+
+    rng: Random
+
+    policy: Callable[["Deck"], bool]
+    """Returns True if the discarded pile should be reshuffled before drawing"""
+
+    buffer: PermutationBuffer | None
+    """Shuffles with pre-generated permutations instead of `rng.shuffle`"""
+
+    listeners: list[Callable[["Deck"], None]]
+    """Called after every reshuffle, see `on_reshuffle`"""
+
+    def __repr__(self):
+        return f"[[Deck:{len(self.cards)}, discarded:{len(self.discarded)}]]"
+
+    def __init__(
+        self,
+        rng: Random,
+        policy: Callable[["Deck"], bool] = reshuffle_when_empty,
+        buffer: PermutationBuffer | None = None,
+    ):
+        self.cards = list(range(NUM_CARDS))
+        self.discarded = []
+        self.rng = rng
+        self.policy = policy
+        self.buffer = buffer
+        self.listeners = []
+
+    def copy(self, rng: Random) -> "Deck":
+        """
+        Same cards in the same order, shuffled by `rng` from now on.
+        The listeners are not copied, they usually belong to another game.
+        """
+        buffer = self.buffer.copy(rng) if self.buffer else None
+        clone = Deck(rng, self.policy, buffer)
+        clone.cards = self.cards.copy()
+        clone.discarded = self.discarded.copy()
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def on_reshuffle(self, listener: Callable[["Deck"], None]):
+        """Subscribes the listener to reshuffle events"""
+        self.listeners.append(listener)
+
+    def shuffle(self):
+        """Shuffles the cards left in the deck"""
+        if self.buffer:
+            self.buffer.shuffle(self.cards)
+        else:
+            self.rng.shuffle(self.cards)
+
+    def reshuffle(self):
+        """Shuffles the discarded pile back into the deck, notifies the listeners"""
+        self.cards.extend(self.discarded)
+        self.discarded = []
+        self.shuffle()
+        for listener in self.listeners:
+            listener(self)
+
+    def draw_one(self) -> Card:
+        if not self.cards or self.policy(self):
+            self.reshuffle()
+        return self.cards.pop()
+
+    def draw(self, num: int) -> list[Card]:
+        """Draws `num` cards, reshuffling as needed"""
+        if self.policy(self):
+            self.reshuffle()
+        drawn = []
+        while num > 0:
+            if not self.cards:
+                self.reshuffle()
+            take = min(num, len(self.cards))
+            drawn.extend(reversed(self.cards[-take:]))
+            del self.cards[-take:]
+            num -= take
+        return drawn
+
+    def discard(self, cards: Iterable[Card]):
+        self.discarded.extend(cards)
+
+    def discard_one(self, card: Card):
+        self.discarded.append(card)
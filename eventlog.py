@@ -0,0 +1,294 @@
+"""
+Compact binary log of games, and a replay engine that rebuilds any round from it.
+
+Every event is a fixed-size record of 8 bytes, little-endian:
+kind (u8), player (i8), other (i8), card (i8), value (i32). See tracing for the kinds.
+Rounds are not stored, ROUND records mark them. Logs of many games are simply
+appended to one file, each game starts with a START record.
+
+The log holds events up to TRACE_ACTION: deals, orders, positions and market cards.
+Blinds, house matches and payouts follow from the rules, the replay recomputes them
+with the engine's own functions. Their per round summaries (PNL, POT, SETTLE) are
+only logged from TRACE_SUMMARY, for analytics: they double the size of a log.
+
+    python eventlog.py sweep.log                   # lists the games
+    python eventlog.py sweep.log -g 17 -r 40       # state of game 17 after round 40
+    python eventlog.py sweep.log -s 1234 --verify  # replays and re-plays game of seed
+"""
+
+import re
+import struct
+import sys
+from array import array
+from mmap import ACCESS_READ, mmap
+from typing import Iterator
+
+from atests import CHECK_OFF
+from card import NUM_CARDS
+from game import (
+    HOUSE_INIT_CHIPS,
+    GameState,
+    create_position,
+    is_playing,
+    match_algo_house,
+    new_game,
+    pay_blind,
+    pay_positions,
+    payout_blinds,
+    play_round,
+)
+from position import get_close_cost, iter_cards
+from tracing import (
+    BROKE,
+    CLOSE,
+    DEAL,
+    DOUBLE,
+    END,
+    MARKET,
+    POST,
+    RESHUFFLE,
+    ROUND,
+    SEED,
+    SEED_BITS,
+    START,
+    TAKE,
+    TRACE_ACTION,
+    Event,
+    Tracer,
+)
+
+RECORD = struct.Struct("<Bbbbi")
+"""kind, player, other, card, value"""
+
+START_RECORD = re.compile(rb"\x00\xff[\x00-\x7f]\xff", re.DOTALL)
+"""Bytes of a START record: kind 0, no player, players, no card"""
+
+
+class EventLog(Tracer):
+    """
+    Tracer packing each event in a 64 bits int, the same bytes as a RECORD.
+    Cheap enough to stay on in production sweeps.
+    """
+
+    records: array
+
+    def __repr__(self):
+        return f"[[EventLog:{len(self.records)} events]]"
+
+    def __init__(self, level: int = TRACE_ACTION):
+        super().__init__(level)
+        self.records = array("q")
+
+    def emit(
+        self,
+        kind: int,
+        round: int,
+        player: int = -1,
+        other: int = -1,
+        card: int = -1,
+        value: int = 0,
+    ):
+        self.records.append(
+            kind
+            | (player & 0xFF) << 8
+            | (other & 0xFF) << 16
+            | (card & 0xFF) << 24
+            | value << 32
+        )
+
+    def tobytes(self) -> bytes:
+        if sys.byteorder == "big":
+            records = array("q", self.records)
+            records.byteswap()
+            return records.tobytes()
+        return self.records.tobytes()
+
+
+def iter_events(data: bytes) -> Iterator[Event]:
+    """Decodes records into events, counting rounds from the ROUND records"""
+    round = 0
+    for kind, player, other, card, value in RECORD.iter_unpack(data):
+        if kind == ROUND:
+            round += 1
+        elif kind == START:
+            round = 0
+        yield (kind, round, player, other, card, value)
+
+
+class GameLog:
+    """Events of one game, and its setup"""
+
+    offset: int
+    """Position of the game in the log, in bytes"""
+    num_players: int
+    init_chips: int
+    seed: int | None
+    rounds: int | None
+    """Rounds played, None if the log was cut before the game ended"""
+    events: list[Event]
+
+    def __repr__(self):
+        return (
+            f"[[Game at {self.offset}: players:{self.num_players},"
+            f" seed:{self.seed}, rounds:{self.rounds}]]"
+        )
+
+    def __init__(self, offset: int, data: bytes):
+        self.offset = offset
+        self.events = list(iter_events(data))
+        _, _, _, self.num_players, _, self.init_chips = self.events[0]
+        self.seed = None
+        self.rounds = None
+        for kind, _, _, other, _, value in self.events:
+            if kind == SEED:
+                self.seed = (self.seed or 0) | value << (SEED_BITS * other)
+            elif kind == END:
+                self.rounds = value
+
+
+def index_games(data: bytes | mmap) -> list[int]:
+    """Offsets of the START records, without decoding the rest of the log"""
+    return [
+        match.start()
+        for match in START_RECORD.finditer(data)
+        if match.start() % RECORD.size == 0
+    ]
+
+
+def read_games(data: bytes | mmap) -> Iterator[GameLog]:
+    offsets = index_games(data)
+    for i, offset in enumerate(offsets):
+        end = offsets[i + 1] if i + 1 < len(offsets) else len(data)
+        yield GameLog(offset, data[offset:end])
+
+
+def replay(game: GameLog, until_round: int | None = None) -> GameState:
+    """
+    Rebuilds the state of the game at the end of `until_round` (0: after the deal),
+    or at the end of the log. The order of the cards left in the deck is not logged.
+    """
+    num_players = game.num_players
+    state = GameState(num_players, seed=game.seed, check_level=CHECK_OFF)
+    state.Chips = [game.init_chips] * num_players + [HOUSE_INIT_CHIPS]
+    state.Hands = [[] for _ in range(num_players)]
+    deck = state.Deck
+    Hands = state.Hands
+
+    for kind, round, player, other, card, value in game.events:
+        if kind == ROUND:
+            if until_round is not None and round > until_round:
+                break
+            state.current_round = round
+            pay_blind(state)
+
+        elif kind == DEAL:
+            Hands[player].append(card)
+
+        elif kind == POST:
+            Hands[player].remove(card)
+            state.Orderbook.post(player, card)
+
+        elif kind == TAKE:
+            Hands[player].remove(card)
+            create_position(state, card, player, state.Orderbook.get(value))
+
+        elif kind == CLOSE:
+            position = state.Positions.get(value)
+            if card >= 0:
+                Hands[player].remove(card)
+                deck.discard_one(card)
+            elif player >= 0:
+                state.Chips[player] -= get_close_cost(position)
+            if other <= 0:
+                deck.discard(position.cards)
+                state.Positions.remove(position)
+
+        elif kind == DOUBLE:
+            Hands[player].remove(card)
+            state.Positions.get(value).add_card(card)
+
+        elif kind == MARKET:
+            match_algo_house(state)
+            deck.discard_one(card)
+            pay_positions(state, card)
+            payout_blinds(state, card)
+
+        elif kind == BROKE:
+            deck.discard(Hands[player])
+            del Hands[player][:]
+
+        elif kind == RESHUFFLE:
+            deck.discarded = []
+
+    at_play = set(iter_cards(state.Positions))
+    at_play.update(order.card for order in state.Orderbook)
+    at_play.update(deck.discarded)
+    for hand in Hands:
+        at_play.update(hand)
+    deck.cards = [card for card in range(NUM_CARDS) if card not in at_play]
+    return state
+
+
+def verify(game: GameLog, until_round: int | None = None) -> bool:
+    """Plays the game again from its seed, checks the replay reaches the same state"""
+    replayed = replay(game, until_round)
+    state = new_game(game.num_players, game.init_chips, False, game.seed, CHECK_OFF)
+    while is_playing(state) and (
+        until_round is None or state.current_round < until_round
+    ):
+        play_round(state)
+
+    return (
+        replayed.current_round == state.current_round
+        and replayed.Chips == state.Chips
+        and replayed.Blinds == state.Blinds
+        and replayed.Hands == state.Hands
+        and [p.cards for p in replayed.Positions] == [p.cards for p in state.Positions]
+        and sorted(replayed.Deck.discarded) == sorted(state.Deck.discarded)
+        and sorted(replayed.Deck.cards) == sorted(state.Deck.cards)
+    )
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    from tracing import event_str
+
+    parser = ArgumentParser(description="Inspects and replays a binary game log")
+    parser.add_argument("path")
+    parser.add_argument("-g", "--game", type=int, default=None, help="index in the log")
+    parser.add_argument("-s", "--seed", type=int, default=None)
+    parser.add_argument("-r", "--round", type=int, default=None)
+    parser.add_argument("--events", action="store_true", help="prints the events")
+    parser.add_argument("--verify", action="store_true", help="re-plays from the seed")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as file:
+        data = mmap(file.fileno(), 0, access=ACCESS_READ)
+        games = read_games(data)
+        if args.game is None and args.seed is None:
+            for i, game in enumerate(games):
+                print(i, game)
+            sys.exit(0)
+
+        for i, game in enumerate(games):
+            if i == args.game or (args.seed is not None and game.seed == args.seed):
+                break
+        else:
+            sys.exit("Game not found")
+
+        print(game)
+        if args.events:
+            for event in game.events:
+                if args.round is None or event[1] <= args.round:
+                    print(event_str(event))
+
+        state = replay(game, args.round)
+        print("Round", state.current_round)
+        print("  Chips", state.Chips)
+        print("  Blinds", state.Blinds)
+        print("  Hands", state.Hands)
+        print("  Positions", state.Positions)
+        print("  Orderbook", state.Orderbook)
+        if args.verify:
+            print("Verified" if verify(game, args.round) else "Replay differs")
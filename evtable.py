@@ -0,0 +1,162 @@
+"""
+Expected payouts of positions for every composition of unseen cards, on disk.
+
+The expected payout of a position on the next market move depends only on the
+composition of the cards a player hasn't seen (see odds.Composition), the size
+class of the position, and the payout constants of position.py. There are
+13 * 9 * 7 squared compositions: the table of every one of them is built once,
+written next to this module and memory-mapped at import. Processes of a pool
+share the same page-cached table instead of each memoising its own odds.
+
+The header holds a hash of the payout constants, a table built with other ones
+is built again when it's opened.
+
+    python evtable.py            # builds the table if it's out of date
+    python evtable.py --rebuild
+"""
+
+import os
+import sys
+from array import array
+from hashlib import blake2b
+from itertools import product
+from math import prod
+from mmap import ACCESS_READ, mmap
+from operator import mul
+from struct import Struct
+
+from odds import DECK, PAYOUTS, Composition, Odds
+from position import (
+    BIG_PAYOUT,
+    BIG_SIZE_CUTOFF,
+    MAX_POSITION_VALUE,
+    MID_PAYOUT,
+    SMALL_PAYOUT,
+    STONK_PAYOUT,
+)
+
+EV_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evtable.bin")
+
+HEADER = Struct("<8s8sQ")
+"""magic, hash of the payout constants, compositions"""
+MAGIC = b"STONKSEV"
+
+NUM_SIZES = 3
+"""SMALL, BIG and FACE, see card.SIZES"""
+
+RADICES: tuple[int, ...] = tuple(n + 1 for n in DECK)
+"""Unseen cards of a kind go from 0 to all of them"""
+NUM_COMPOSITIONS = prod(RADICES)
+
+STRIDES: tuple[int, ...] = tuple(
+    prod(RADICES[kind + 1 :]) * NUM_SIZES for kind in range(len(RADICES))
+)
+"""Index of a composition's payouts in the table: sum of its counts by the strides"""
+
+Payouts = memoryview
+"""Expected payout of the long side per size class, like `Odds.payouts`"""
+
+
+def table_key() -> bytes:
+    """Hash of what the table is computed from, it's built again if it changes"""
+    constants = (
+        SMALL_PAYOUT,
+        MID_PAYOUT,
+        BIG_PAYOUT,
+        STONK_PAYOUT,
+        BIG_SIZE_CUTOFF,
+        MAX_POSITION_VALUE,
+        PAYOUTS,
+        DECK,
+        sys.byteorder,
+    )
+    return blake2b(repr(constants).encode(), digest_size=8).digest()
+
+
+def build_table() -> array:
+    """
+    Payouts of every composition, in the order of `STRIDES`. With every card seen,
+    the market card comes from a reshuffle: full deck payouts, see `market_odds`
+    """
+    table = array("d")
+    for composition in product(*(range(radix) for radix in RADICES)):
+        table.extend(Odds(composition if any(composition) else DECK).payouts)
+    return table
+
+
+def write_table(path: str = EV_TABLE_PATH):
+    """Builds the table to a temporary file then moves it, workers may race on it"""
+    temp_path = f"{path}.{os.getpid()}"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, table_key(), NUM_COMPOSITIONS))
+        build_table().tofile(file)
+    os.replace(temp_path, path)
+
+
+def open_table(path: str = EV_TABLE_PATH) -> mmap | None:
+    """The table file memory-mapped, None if it's missing or out of date"""
+    size = HEADER.size + NUM_COMPOSITIONS * NUM_SIZES * 8
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size != size:
+                return None
+            data = mmap(file.fileno(), 0, access=ACCESS_READ)
+    except OSError:
+        return None
+    if HEADER.unpack_from(data) != (MAGIC, table_key(), NUM_COMPOSITIONS):
+        data.close()
+        return None
+    return data
+
+
+class EvTable:
+    """Expected payouts by composition, an O(1) lookup in the memory-mapped table"""
+
+    path: str
+    is_mapped: bool
+    """False if the table couldn't be written, it's then kept in memory"""
+    table: memoryview
+
+    def __repr__(self):
+        where = self.path if self.is_mapped else "memory"
+        return f"[[EvTable {NUM_COMPOSITIONS} compositions in {where}]]"
+
+    def __init__(self, path: str = EV_TABLE_PATH):
+        self.path = path
+        data = open_table(path)
+        if data is None:
+            try:
+                write_table(path)
+                data = open_table(path)
+            except OSError:
+                pass
+        self.is_mapped = data is not None
+        if data is None:
+            data = HEADER.pack(MAGIC, table_key(), NUM_COMPOSITIONS)
+            data += build_table().tobytes()
+        self.table = memoryview(data)[HEADER.size :].cast("d")
+
+    def payouts(self, composition: Composition) -> Payouts:
+        """Expected payout of the long side per size class, the short side's opposite"""
+        i = sum(map(mul, composition, STRIDES))
+        return self.table[i : i + NUM_SIZES]
+
+
+EV_TABLE = EvTable()
+"""Mapped once per process, at import"""
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from time import perf_counter
+
+    parser = ArgumentParser(description="Builds the table of expected payouts")
+    parser.add_argument("--path", default=EV_TABLE_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="even if up to date")
+    args = parser.parse_args()
+
+    t = perf_counter()
+    if args.rebuild or open_table(args.path) is None:
+        write_table(args.path)
+        print(f"Built {args.path} in {perf_counter() - t:.1f}s")
+    print(EvTable(args.path))
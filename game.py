@@ -1,328 +1,730 @@
 from math import floor
-from random import shuffle
-from functools import reduce
+from random import Random
+from functools import partial, reduce
+from typing import Callable
 
 from card import *
 from position import (
     BIG_PAYOUT,
-    MAX_POSITION_VALUE,
+    STONK_PAYOUT,
     Position,
-    flat_positions,
+    PositionBook,
     get_close_cost,
     get_payout_size,
     get_player_paid,
-    get_value_position,
+    iter_cards,
+)
+from closing import is_closing
+from deck import Deck, PermutationBuffer, reshuffle_when_empty
+from orderbook import Order, Orderbook
+from strategy import DEFAULT_PROFILE, Strategy, StrategyProfile, print_welcome
+from tracker import PublicCards
+from profiler import (
+    PHASE_ACTIONS,
+    PHASE_BANKRUPTCY,
+    PHASE_BLIND,
+    PHASE_BLINDS,
+    PHASE_CHECKS,
+    PHASE_HOUSE,
+    PHASE_MARKET,
+    PHASE_PAYOUTS,
+    PHASE_VALIDATION,
+    Profiler,
+)
+from tracing import (
+    BLIND,
+    BLINDS,
+    BROKE,
+    CLOSE,
+    DEAL,
+    DOUBLE,
+    END,
+    FEE,
+    HOUSE,
+    MARKET,
+    PAYOUT,
+    PNL,
+    POST,
+    POT,
+    RESHUFFLE,
+    ROUND,
+    SEED,
+    SEED_BITS,
+    SETTLE,
+    SEED_MASK,
+    START,
+    TAKE,
+    TRACE_ACTION,
+    TRACE_EVENT,
+    TRACE_GAME,
+    TRACE_ROUND,
+    TRACE_SUMMARY,
+    TextSink,
+    Tracer,
+)
+from atests import (
+    CHECK_FULL,
+    CHECK_INCREMENTAL,
+    CHECK_SAMPLED,
+    Ledger,
+    Ok,
+    game_card_number,
+    players_limited_cards,
+    test_strategy,
 )
-from strategy import Strategy
-from atests import Ok, game_card_number, players_limited_cards, test_strategy
-
-
-def log(*args):
-    if is_printing:
-        print(*args)
 
 
 HOUSE_INIT_CHIPS = 999_999
 HOUSE_PREVENTION_CUTOFF = 500_000
 CARDS_PER_PLAYER = 6
-
-total_players = 0
-current_round = 0
-
-is_printing = True
+CHECK_EVERY = 100
+FREE_FOR_ALL_PASSES = CARDS_PER_PLAYER
 
 
 """
-A card is a string of 2 chars, see CARDS for examples
+A card is an int in range(52), see CARDS for its name
 """
 
-Chips: list[int] = []
-"""Stack of chips per player_id"""
 
-Blinds: int = 0
-"""Pot of blinds that gets paid out if there's a stonk payout"""
+class GameState:
+    """
+    Full state of one game. Every engine function works on an explicit GameState,
+    so many games can be played (or interleaved) in the same process.
+    """
+
+    Chips: list[int]
+    """Stack of chips per player_id"""
+
+    Blinds: int
+    """Pot of blinds that gets paid out if there's a stonk payout"""
 
-Hands: list[list[str]] = []
-"""Hands per player_id"""
+    Hands: list[list[Card]]
+    """Hands per player_id"""
 
-Strategies: list[Strategy] = []
-"""Strategies per player_id"""
+    Strategies: list[Strategy]
+    """Strategies per player_id"""
 
-Deck: list[str] = CARDS.copy()
-"""List of cards, draw from here"""
+    Public: PublicCards
+    """Cards every player has seen since the last reshuffle, shared by the Strategies"""
 
-Discarded: list[str] = []
-"""List of cards, useful for reshuffling"""
+    Deck: Deck
+    """Cards to draw from, and the discarded pile they are reshuffled from"""
 
-Positions: list[Position] = [] * len(Chips)
-"""List of positions, unordered"""
+    Positions: PositionBook
+    """Open positions, indexed by id and by player"""
 
-Orderbook: dict[int, list[str]] = []
-"""Dict of player_id mapped to list of cards they play this round"""
+    Orderbook: Orderbook
+    """Cards played to the orderbook this round, waiting for a taker"""
 
+    total_players: int
+    current_round: int
 
-def reset_all():
-    global Chips, Blinds, Hands, Strategies, Deck, Discarded, Positions, Orderbook
-    Chips = []
-    Blinds = 0
-    Hands = []
-    Strategies = []
-    Deck = CARDS.copy()
-    Discarded = []
-    Positions = []
-    Orderbook = {}
+    tracer: Tracer | None
+    """Records the game's events, see tracing. None in headless runs"""
 
+    profiler: Profiler | None
+    """Times the phases of each round, see profiler. None unless asked for"""
+
+    free_for_all: bool
+    """
+    Variation: players bet in any order, going around the table until nobody acts
+    (at most FREE_FOR_ALL_PASSES times per round)
+    """
 
-def init_game(num_players: int, init_chips: int, play: bool) -> tuple[list[int], int]:
+    rng: Random
+    """Shuffles the deck, own per game so seeded games are reproducible"""
+
+    check_level: int
+    """How much of the game's invariants are checked, see CHECK_* in atests"""
+
+    check_every: int
+    """Rounds between full checks, with CHECK_SAMPLED"""
+
+    ledger: Ledger | None
+    """Counts cards as they move, only with CHECK_INCREMENTAL"""
+
+    def __init__(
+        self,
+        num_players: int = 0,
+        tracer: Tracer | None = None,
+        seed: int | None = None,
+        check_level: int = CHECK_FULL,
+        check_every: int = CHECK_EVERY,
+        policy: Callable[[Deck], bool] = reshuffle_when_empty,
+        permutations: bool = False,
+    ):
+        self.rng = Random(seed)
+        self.Chips = []
+        self.Blinds = 0
+        self.Hands = []
+        self.Strategies = []
+        self.Public = PublicCards()
+        self.Deck = Deck(
+            self.rng, policy, PermutationBuffer(self.rng) if permutations else None
+        )
+        self.Positions = PositionBook()
+        self.Orderbook = Orderbook()
+        self.total_players = num_players
+        self.current_round = 0
+        self.tracer = tracer
+        self.profiler = None
+        self.free_for_all = False
+        self.check_level = check_level
+        self.check_every = check_every
+        if check_level == CHECK_INCREMENTAL:
+            self.ledger = Ledger(num_players)
+        else:
+            self.ledger = None
+
+    def fork(self, rng: Random | None = None) -> "GameState":
+        """
+        Independent copy of the game, to play out futures without touching this one.
+        Forks are headless: no tracer and no profiler.
+        The fork's deck draws the same cards in the same order, then shuffles with
+        a copy of this game's rng, or with `rng`: copying the rng's state is most of
+        the cost of a fork, rollouts sharing one rng are cheaper.
+        """
+        clone = GameState.__new__(GameState)
+        clone.tracer = None
+        clone.profiler = None
+        clone.__copy_from(self, rng)
+        return clone
+
+    def snapshot(self) -> "GameState":
+        """Frozen copy of the game, to `restore` it any number of times"""
+        return self.fork()
+
+    def restore(self, snapshot: "GameState"):
+        """Rewinds the game to the snapshot, keeping its tracer and profiler"""
+        self.__copy_from(snapshot, None)
+
+    def __copy_from(self, state: "GameState", rng: Random | None):
+        """
+        Copies what the game mutates, shares what it doesn't: Orders, profiles,
+        the deck's policy. Positions keep their cached sums, nothing is rescanned.
+        """
+        if rng is None:
+            rng = Random.__new__(Random)
+            rng.setstate(state.rng.getstate())
+        self.rng = rng
+        self.Chips = state.Chips.copy()
+        self.Blinds = state.Blinds
+        self.Hands = [hand.copy() for hand in state.Hands]
+        self.Public = public = state.Public.copy()
+        self.Strategies = [strategy.copy(public) for strategy in state.Strategies]
+        self.Deck = state.Deck.copy(rng)
+        self.Deck.on_reshuffle(partial(reset_public, self))
+        self.Positions = state.Positions.copy()
+        self.Orderbook = state.Orderbook.copy()
+        self.total_players = state.total_players
+        self.current_round = state.current_round
+        self.free_for_all = state.free_for_all
+        self.check_level = state.check_level
+        self.check_every = state.check_every
+        self.ledger = state.ledger.copy() if state.ledger else None
+
+
+def new_game(
+    num_players: int,
+    init_chips: int,
+    play: bool,
+    seed: int | None = None,
+    check_level: int = CHECK_FULL,
+    policy: Callable[[Deck], bool] = reshuffle_when_empty,
+    permutations: bool = False,
+    tracer: Tracer | None = None,
+    profiles: list[StrategyProfile] | None = None,
+    profiler: Profiler | None = None,
+) -> GameState:
     """
     Configures a new game, with auto Strategies and one agent.
-    Returns: Chips (final state), round_count.
+    Games with the same seed play out the same way.
+    `policy` decides when the deck is reshuffled, see deck.py. With `permutations`
+    the deck shuffles with pre-generated permutations of the seed.
+    `tracer` records the game's events, an agent playing sees each round by default.
+    `profiles` sets the biases of each player's Strategy, the default profile if None.
+    `profiler` times the phases of every round.
     """
+    Ok(profiles is None or len(profiles) == num_players, "One profile per player")
     Ok(CARDS_PER_PLAYER * (num_players + 1) <= len(CARDS), "Too many players")
-    global Orderbook, is_printing, total_players
-    reset_all()
-
-    is_printing = play
-    total_players = num_players
-    Orderbook = {}
-
-    shuffle(Deck)
+    if play:
+        print_welcome()
+        if tracer is None:
+            tracer = Tracer(TRACE_ROUND, TextSink())
+    state = GameState(
+        num_players,
+        tracer=tracer,
+        seed=seed,
+        check_level=check_level,
+        policy=policy,
+        permutations=permutations,
+    )
+    state.profiler = profiler
+
+    state.Deck.shuffle()
+    if tracer and tracer.level >= TRACE_GAME:
+        tracer.emit(START, 0, other=num_players, value=init_chips)
+        if isinstance(seed, int):
+            """Random uses the absolute value of the seed"""
+            bits, part = abs(seed), 0
+            while part == 0 or bits:
+                tracer.emit(SEED, 0, other=part, value=bits & SEED_MASK)
+                bits >>= SEED_BITS
+                part += 1
 
     """Setup players Chips, Hands and Strategies"""
     for player_id in range(num_players):
-        Chips.append(init_chips)
+        state.Chips.append(init_chips)
 
-        hand: list[str] = []
-        for _ in range(CARDS_PER_PLAYER):
-            hand.append(Deck.pop())
-        Hands.append(hand)
+        hand: list[Card] = state.Deck.draw(CARDS_PER_PLAYER)
+        state.Hands.append(hand)
+        if state.ledger:
+            state.ledger.deal(player_id, CARDS_PER_PLAYER)
+        if tracer and tracer.level >= TRACE_ACTION:
+            for card in hand:
+                tracer.emit(DEAL, 0, player_id, card=card)
 
-        Strategies.append(Strategy(player_id, hand, player_id==0, playing=play))
+        profile = profiles[player_id] if profiles else DEFAULT_PROFILE
+        state.Strategies.append(
+            Strategy(player_id, hand, player_id == 0, play, state.Public, profile)
+        )
 
     """The house is the last chip holder, player_id=-1"""
-    Chips.append(HOUSE_INIT_CHIPS)
+    state.Chips.append(HOUSE_INIT_CHIPS)
 
-    return gameloop()
+    """Reshuffling resets all Strategy's state"""
+    state.Deck.on_reshuffle(partial(reset_public, state))
 
+    return state
 
-def gameloop() -> tuple[list[int], int]:
+
+def init_game(
+    num_players: int,
+    init_chips: int,
+    play: bool,
+    seed: int | None = None,
+    check_level: int = CHECK_FULL,
+    tracer: Tracer | None = None,
+) -> tuple[list[int], int]:
     """
-    Plays automatically until a winner is found.
+    Configures and plays a new game, with auto Strategies and one agent.
     Returns: Chips (final state), round_count.
     """
-    global Orderbook, Deck, Discarded, current_round
-    current_round = 0
-
-    while is_playing():
-        current_round += 1
-        game_card_number(Positions, Hands, Deck, Discarded)
+    state = new_game(num_players, init_chips, play, seed, check_level, tracer=tracer)
+    return gameloop(state)
 
-        # TODO broke players dont pay blinds
-        pay_blind()
 
-        """Market opens: players open and close positions"""
-        for i in range(total_players):
-            """Every round a different player starts"""
-            player_id: int = (i + current_round) % total_players
-            if Chips[player_id] <= 0:
-                continue
-
-            hand = Hands[player_id]
-            cs = Strategies[player_id]
-
-            if not cs.compute_current_action(
-                hand.copy(), Positions, Chips, Orderbook, Blinds
-            ):
-                continue
-
-            f_open = list(cs.open_cards.keys())
-            f_close = [cs.close_cards[c] for c in cs.close_cards if cs.close_cards[c]]
-            new_cards = f_open + f_close
-            test_strategy(new_cards, hand)
-
-            """Opening and closing positions reveals cards"""
-            [s.update_state(new_cards) for s in Strategies if s.player_id != player_id]
-
-            """Implements strategy's actions"""
-            [hand.remove(card) for card in new_cards]
-
-            for my_card in cs.open_cards:
-                if type(cs.open_cards[my_card]) == Position:
-                    """Double down: WIP"""
-                    # TODO double down
-                    pass
-                elif type(cs.open_cards[my_card]) == str:
-                    """Market taker"""
-                    active_card__id = my_card + "_" + str(player_id)
-                    create_position(active_card__id, cs.open_cards[my_card])
-                else:
-                    """Market maker"""
-                    if Orderbook.get(player_id):
-                        Orderbook[player_id].append(my_card)
-                    else:
-                        Orderbook[player_id] = [my_card]
-
-            for my_position in cs.close_cards:
-                my_card = cs.close_cards[my_position]
-                if type(my_card) == str:
-                    close_positions(my_position, my_card, player_id)
-                    # TODO may close position with more than one card
-                else:
-                    close_positions(my_position, None, player_id)
-                    Chips[player_id] -= get_close_cost(my_position)
-
-            """Makes sure we didnt break anything"""
-            players_limited_cards(Positions, Hands, Chips, Orderbook, CARDS_PER_PLAYER)
-
-        """Match rest of orderbook with house"""
-        match_algo_house()
-
-        """Market closes: market moves, update state of strategies"""
-        if len(Deck) == 0:
-            Deck = Discarded.copy()
-            shuffle(Deck)
-            market_card = Deck.pop()
-            Discarded = [market_card]
-
-            cards = flat_positions(Positions)
-            cards.append(market_card)
-            [s.update_state(cards + Hands[s.player_id], reset=True) for s in Strategies]
-        else:
-            market_card = Deck.pop()
-            Discarded.append(market_card)
-            [s.update_state([market_card]) for s in Strategies]
-
-        log("Market card", market_card)
+def gameloop(state: GameState) -> tuple[list[int], int]:
+    """
+    Plays automatically until a winner is found.
+    Returns: Chips (final state), round_count.
+    """
+    state.current_round = 0
 
-        """Payout positions"""
-        for p in Positions:
-            payout = get_payout_size(p, market_card)
+    while is_playing(state):
+        play_round(state)
 
-            if is_long(market_card):
-                Chips[p.long] += payout
-                Chips[p.short] -= payout
-            else:
-                Chips[p.long] -= payout
-                Chips[p.short] += payout
+    tracer = state.tracer
+    if tracer and tracer.level >= TRACE_GAME:
+        tracer.emit(END, state.current_round, value=state.current_round)
 
-            """Pays the house its due"""
-            if p.has_house:
-                Chips[p.long * p.short * -1] -= 1
+    return state.Chips, state.current_round
 
-        payout_blinds(market_card)
 
-        """Bankrupt players: close positions"""
-        for position in Positions:
-            if Chips[position.long] <= 0 or Chips[position.short] <= 0:
-                close_positions(position, None, -1)
+def play_round(state: GameState):
+    """
+    Plays one full round: blinds, market open, house matching, market move and payouts.
+    Games can be interleaved by stepping their states one round at a time.
+    """
+    Chips = state.Chips
+    Hands = state.Hands
+    ledger = state.ledger
+    tracer = state.tracer
+    profiler = state.profiler
+    if profiler:
+        profiler.start()
+
+    state.current_round += 1
+    if tracer and tracer.level >= TRACE_ROUND:
+        tracer.emit(ROUND, state.current_round)
+    if tracer and tracer.level >= TRACE_SUMMARY:
+        round_chips = Chips.copy()
+
+    """Makes sure we didnt break anything: full checks may be sampled or incremental"""
+    is_checking = state.check_level == CHECK_FULL or (
+        state.check_level == CHECK_SAMPLED
+        and state.current_round % state.check_every == 0
+    )
+    if is_checking:
+        game_card_number(state.Positions, Hands, state.Deck.cards, state.Deck.discarded)
+    elif ledger:
+        ledger.card_number(state.Deck.cards, state.Deck.discarded)
+    if profiler:
+        profiler.lap(PHASE_CHECKS)
+
+    # TODO broke players dont pay blinds
+    pay_blind(state)
+    if profiler:
+        profiler.lap(PHASE_BLIND)
+
+    """Market opens: players open and close positions"""
+    is_acting = True
+    passes = 0
+    max_passes = FREE_FOR_ALL_PASSES if state.free_for_all else 1
+    while is_acting and passes < max_passes:
+        """Free-for-all goes around the table until every player is satisfied"""
+        is_acting = False
+        passes += 1
+        for i in range(state.total_players):
+            """Every round a different player starts"""
+            player_id: int = (i + state.current_round) % state.total_players
+            is_acting = play_turn(state, player_id, is_checking) or is_acting
 
-        """Bankrupt players: discard hand"""
-        for player_id, hand in enumerate(Hands):
-            if Chips[player_id] <= 0:
-                Discarded.extend(hand)
-                del hand[:]
+    settle_round(state)
 
-    return Chips, current_round
+    if tracer and tracer.level >= TRACE_SUMMARY:
+        for player_id in range(state.total_players):
+            if Chips[player_id] != round_chips[player_id]:
+                pnl = Chips[player_id] - round_chips[player_id]
+                tracer.emit(PNL, state.current_round, player_id, value=pnl)
 
 
-def create_position(active_card__id: str, passive_card__id: str):
+def settle_round(state: GameState):
+    """
+    Market closes: house matching, market move, payouts and bankruptcies.
+    The end of `play_round`, once every player played.
     """
-    Creates a new Position from the given two cards,
-    removes passive_card from the orderbook
+    Chips = state.Chips
+    Hands = state.Hands
+    ledger = state.ledger
+    tracer = state.tracer
+    profiler = state.profiler
+
+    """Match rest of orderbook with house"""
+    match_algo_house(state)
+    if profiler:
+        profiler.lap(PHASE_HOUSE)
+
+    """Market closes: market moves, every strategy sees it"""
+    market_card = state.Deck.draw_one()
+    state.Deck.discard_one(market_card)
+    state.Public.reveal((market_card,))
+    if tracer and tracer.level >= TRACE_ROUND:
+        tracer.emit(MARKET, state.current_round, card=market_card)
+    if profiler:
+        profiler.lap(PHASE_MARKET)
+
+    """Payout positions"""
+    pay_positions(state, market_card)
+    if profiler:
+        profiler.lap(PHASE_PAYOUTS)
+    payout_blinds(state, market_card)
+    if profiler:
+        profiler.lap(PHASE_BLINDS)
+
+    """Bankrupt players: close positions"""
+    for position in list(state.Positions):
+        if Chips[position.long] <= 0 or Chips[position.short] <= 0:
+            close_positions(state, position, None, -1)
+
+    """Bankrupt players: discard hand"""
+    for player_id, hand in enumerate(Hands):
+        if Chips[player_id] <= 0:
+            if hand and tracer and tracer.level >= TRACE_ROUND:
+                tracer.emit(BROKE, state.current_round, player_id)
+            state.Deck.discard(hand)
+            if ledger:
+                ledger.discard(player_id, len(hand))
+            del hand[:]
+    if profiler:
+        profiler.lap(PHASE_BANKRUPTCY)
+
+
+def play_turn(state: GameState, player_id: int, is_checking: bool) -> bool:
     """
-    [passive_card, p_player_id] = passive_card__id.split("_")
-    [active_card, a_player_id] = active_card__id.split("_")
-    p_player_id = int(p_player_id)
-    a_player_id = int(a_player_id)
+    The player's Strategy opens and closes positions.
+    Returns True if the player did any action.
+    """
+    Chips = state.Chips
+    if Chips[player_id] <= 0:
+        return False
 
-    Orderbook[p_player_id].remove(passive_card)
+    hand = state.Hands[player_id]
+    cs = state.Strategies[player_id]
+    profiler = state.profiler
 
-    if is_long(active_card):
-        position = Position(a_player_id, p_player_id, [active_card, passive_card])
-    else:
-        position = Position(p_player_id, a_player_id, [active_card, passive_card])
-    Positions.append(position)
+    is_acting = cs.compute_current_action(
+        hand.copy(), state.Positions, Chips, state.Orderbook, state.Blinds
+    )
+    if profiler:
+        profiler.lap_strategy(player_id)
+    if not is_acting:
+        return False
 
+    apply_actions(state, player_id, is_checking)
+    return True
 
-def match_algo_house():
-    """Matches remaining orderbook with the house"""
-    global Orderbook
 
-    for player_id in Orderbook:
-        player_cards = Orderbook[player_id]
-        for card in player_cards:
-            if is_long(card):
-                position = Position(player_id, -1, [card])
-            else:
-                position = Position(-1, player_id, [card])
-            Positions.append(position)
+def apply_actions(state: GameState, player_id: int, is_checking: bool):
+    """
+    Takes the actions the player's Strategy set in open_cards and close_cards.
+    The end of `play_turn`, once the Strategy decided.
+    """
+    Chips = state.Chips
+    ledger = state.ledger
+    hand = state.Hands[player_id]
+    cs = state.Strategies[player_id]
+    profiler = state.profiler
+
+    f_open = list(cs.open_cards.keys())
+    f_close = [c for cards in cs.close_cards.values() if cards for c in cards]
+    new_cards = f_open + f_close
+    test_strategy(new_cards, hand)
+    if profiler:
+        profiler.lap(PHASE_VALIDATION)
+
+    """Opening and closing positions reveals cards"""
+    state.Public.reveal(new_cards)
+    cs.reveal(new_cards)
+
+    """Implements strategy's actions"""
+    [hand.remove(card) for card in new_cards]
+    if ledger:
+        ledger.play(player_id, len(f_open))
+        ledger.discard(player_id, len(f_close))
+
+    for my_card in cs.open_cards:
+        target = cs.open_cards[my_card]
+        if type(target) == Position:
+            """Double down, README fair play: not on a position I'm closing"""
+            Ok(
+                target not in cs.close_cards,
+                f"Strategy Error: {player_id} doubles down on {target} and closes it",
+            )
+            double_down(state, my_card, player_id, target)
+        elif type(target) == Order:
+            """Market taker"""
+            create_position(state, my_card, player_id, target)
+        else:
+            """Market maker"""
+            state.Orderbook.post(player_id, my_card)
+            if ledger:
+                ledger.post(player_id)
+            if state.tracer and state.tracer.level >= TRACE_ACTION:
+                state.tracer.emit(POST, state.current_round, player_id, card=my_card)
+
+    for my_position in cs.close_cards:
+        my_cards = cs.close_cards[my_position]
+        close_positions(state, my_position, my_cards, player_id)
+        if my_cards is None:
+            Chips[player_id] -= get_close_cost(my_position)
+    if profiler:
+        profiler.lap(PHASE_ACTIONS)
+
+    """Makes sure we didnt break anything"""
+    if is_checking:
+        players_limited_cards(
+            state.Positions, state.Hands, Chips, state.Orderbook, CARDS_PER_PLAYER
+        )
+    elif ledger:
+        ledger.limited_cards(Chips, CARDS_PER_PLAYER)
+    if profiler:
+        profiler.lap(PHASE_VALIDATION)
+
+
+def create_position(state: GameState, card: Card, player_id: int, order: Order):
+    """
+    Creates a new Position from the taker's card and the order it takes,
+    removes the order from the orderbook
+    """
+    Ok(order in state.Orderbook, f"Strategy Error: {order} is not in the orderbook")
+    Ok(
+        LONGS[card] != LONGS[order.card],
+        f"Strategy Error: {card_str(card)} takes same-colour {order}",
+    )
+    state.Orderbook.take(order)
+
+    if is_long(card):
+        position = Position(player_id, order.player_id, [card, order.card])
+    else:
+        position = Position(order.player_id, player_id, [card, order.card])
+    state.Positions.add(position)
 
-    Orderbook = {}
+    if state.ledger:
+        state.ledger.unpost(order.player_id)
+        state.ledger.open(position)
+    tracer = state.tracer
+    if tracer and tracer.level >= TRACE_ACTION:
+        tracer.emit(
+            TAKE, state.current_round, player_id, order.player_id, card, order.card
+        )
 
 
-def close_positions(close_pos: Position, close_card: str, close_player_id: int):
+def double_down(state: GameState, card: Card, player_id: int, position: Position):
+    """
+    Puts the card on the player's side of the position, which is revalued in place.
+    The player is dealt a card: the pile still counts as one of their cards at play
+    """
+    Ok(
+        position in state.Positions and position.is_doubling(card, player_id),
+        f"Strategy Error: {player_id} cant double down on {position}"
+        f" with {card_str(card)}",
+    )
+    position.add_card(card)
+    tracer = state.tracer
+    if tracer and tracer.level >= TRACE_ACTION:
+        round = state.current_round
+        tracer.emit(DOUBLE, round, player_id, card=card, value=position.id)
+    deal_card(state, player_id)
+
+
+def match_algo_house(state: GameState):
+    """Matches remaining orderbook with the house, in arrival order"""
+    for order in state.Orderbook:
+        if is_long(order.card):
+            position = Position(order.player_id, -1, [order.card])
+        else:
+            position = Position(-1, order.player_id, [order.card])
+        state.Positions.add(position)
+        if state.ledger:
+            state.ledger.unpost(order.player_id)
+            state.ledger.open(position)
+        if state.tracer and state.tracer.level >= TRACE_EVENT:
+            state.tracer.emit(
+                HOUSE, state.current_round, order.player_id, card=order.card
+            )
+
+    state.Orderbook.clear()
+
+
+def close_positions(
+    state: GameState,
+    close_pos: Position,
+    close_cards: list[Card] | None,
+    close_player_id: int,
+):
     """
-    Closes the position with the card, discards all cards and deals new cards to palyers.
+    Closes the position with the cards, discards all cards and deals new cards to palyers.
     Will throw an error if it cant close the position with the given cards.
     """
-    global Positions, Discarded, Deck
-
-    if close_card and close_player_id >= 0:
+    if close_cards is not None:
         """Verifying we can close the position. Will throw an error if it cant"""
-        is_value_ok = get_value(close_card) >= get_value_position(close_pos)
-        is_color_ok = is_long(close_card) != close_pos.is_player_long(close_player_id)
-        # TODO uncoment line below
-        # Ok(close_card[0] == "A" or (is_value_ok and is_color_ok), f"Strategy Error: {close_player_id} cant close position {close_pos} with {close_card}")
-        Discarded.append(close_card)
-    Discarded.extend(close_pos.cards)
-    Positions = [p for p in Positions if p != close_pos]
-
-    """Deals cards to players: 2 cards to one forcing the close, one card to the other"""
-    did_reshuffle = False
-
+        Ok(
+            is_closing(close_cards, close_pos, close_player_id),
+            f"Strategy Error: {close_player_id} cant close position {close_pos}"
+            f" with {cards_str(close_cards)}",
+        )
+        state.Deck.discard(close_cards)
+    state.Deck.discard(close_pos.cards)
+    state.Positions.remove(close_pos)
+    if state.ledger:
+        state.ledger.close(close_pos)
+    tracer = state.tracer
+    is_tracing = tracer and tracer.level >= TRACE_ACTION
+    if is_tracing:
+        """One event per card, the last one closes the position"""
+        cards = close_cards or [-1]
+        for i, card in enumerate(cards):
+            left = len(cards) - 1 - i
+            tracer.emit(
+                CLOSE, state.current_round, close_player_id, left, card, close_pos.id
+            )
+
+    """Deals cards to players: one to each side, and one per card closing it"""
     deals = [close_pos.long, close_pos.short]
-    if close_card:
-        """Deal twice to player if they closed the position with cards"""
-        deals.append(close_player_id)
+    if close_cards is not None:
+        deals.extend([close_player_id] * len(close_cards))
     for player_id in [p_id for p_id in deals if p_id != -1]:
-        if len(Deck) == 0:
-            Deck = Discarded.copy()
-            Discarded = []
-            shuffle(Deck)
-            did_reshuffle = True
-        card = Deck.pop()
-        Hands[player_id].append(card)
-        Strategies[player_id].update_state([card])
-
-    if did_reshuffle:
-        """Reshuffling resets all Strategy's state"""
-        for i, strategy in enumerate(Strategies):
-            strategy.update_state(Hands[i] + flat_positions(Positions), reset=True)
-
-
-def is_playing() -> bool:
+        deal_card(state, player_id)
+
+
+def deal_card(state: GameState, player_id: int):
+    """Deals the player a card from the deck"""
+    card = state.Deck.draw_one()
+    state.Hands[player_id].append(card)
+    state.Strategies[player_id].update_state([card])
+    if state.ledger:
+        state.ledger.deal(player_id)
+    tracer = state.tracer
+    if tracer and tracer.level >= TRACE_ACTION:
+        tracer.emit(DEAL, state.current_round, player_id, card=card)
+
+
+def reset_public(state: GameState, deck: Deck):
     """
-    Will play until there's only one chipholder left, excluding the house (id=-1)
+    Reshuffling resets the public cards to the ones on the table,
+    each Strategy still knows its hand
     """
-    return reduce(lambda a, v: (v > 0) + a, Chips[:-1], 0) > 1
+    state.Public.reset(iter_cards(state.Positions))
+    if state.tracer and state.tracer.level >= TRACE_ACTION:
+        state.tracer.emit(RESHUFFLE, state.current_round, value=len(deck.cards))
 
 
-def pay_blind():
-    global Blinds, Chips
+def is_playing(state: GameState) -> bool:
+    """
+    Will play until there's only one chipholder left, excluding the house (id=-1)
+    """
+    return reduce(lambda a, v: (v > 0) + a, state.Chips[:-1], 0) > 1
+
+
+def pay_blind(state: GameState):
+    player_id = (state.total_players + state.current_round) % state.total_players
+    state.Chips[player_id] -= BIG_PAYOUT
+    state.Blinds += BIG_PAYOUT
+    if state.tracer and state.tracer.level >= TRACE_EVENT:
+        state.tracer.emit(BLIND, state.current_round, player_id, value=BIG_PAYOUT)
+
+
+def pay_positions(state: GameState, market_card: Card):
+    """Pays every position according to the market card, players pay the house fees"""
+    Chips = state.Chips
+    tracer = state.tracer
+    is_tracing = tracer and tracer.level >= TRACE_EVENT
+    is_settling = tracer and tracer.level >= TRACE_SUMMARY
+    stonks = 0
+    for p in state.Positions:
+        payout = get_payout_size(p, market_card)
+        if is_settling and payout == STONK_PAYOUT:
+            stonks += 1
+
+        if is_long(market_card):
+            Chips[p.long] += payout
+            Chips[p.short] -= payout
+            if is_tracing:
+                tracer.emit(PAYOUT, state.current_round, p.long, p.short, value=payout)
+        else:
+            Chips[p.long] -= payout
+            Chips[p.short] += payout
+            if is_tracing:
+                tracer.emit(PAYOUT, state.current_round, p.short, p.long, value=payout)
+
+        """Pays the house its due"""
+        if p.has_house:
+            Chips[p.long * p.short * -1] -= 1
+            if is_tracing:
+                tracer.emit(FEE, state.current_round, p.long * p.short * -1, value=1)
 
-    player_id = (total_players + current_round) % total_players
-    Chips[player_id] -= BIG_PAYOUT
-    Blinds += BIG_PAYOUT
+    if is_settling and state.Positions:
+        num_paid = len(state.Positions)
+        tracer.emit(SETTLE, state.current_round, other=num_paid, value=stonks)
 
 
-def payout_blinds(market_card: str):
-    global Blinds, Chips
+def payout_blinds(state: GameState, market_card: Card):
     paid_players = []
-    for p in Positions:
-        if get_value_position(p) == MAX_POSITION_VALUE:
+    for p in state.Positions:
+        if p.is_face:
+            """Face positions share the pot, whatever the value of their pile"""
             paid_players.append(get_player_paid(market_card, p))
 
     if len(paid_players) > 0:
+        tracer = state.tracer
+        if tracer and tracer.level >= TRACE_SUMMARY:
+            tracer.emit(
+                POT, state.current_round, other=len(paid_players), value=state.Blinds
+            )
+        share = floor(state.Blinds / len(paid_players))
         for player_id in paid_players:
-            Chips[player_id] += floor(Blinds / len(paid_players))
-        Blinds = 0
+            state.Chips[player_id] += share
+            if tracer and tracer.level >= TRACE_EVENT:
+                tracer.emit(BLINDS, state.current_round, player_id, value=share)
+        state.Blinds = 0
@@ -0,0 +1,431 @@
+"""
+Monte Carlo tree search Strategy: plays out random futures of the game at every
+decision. Slow, but a strong reference opponent to evaluate the cheaper bots.
+
+The tree of a decision is the player's turn. A node is the set of moves taken so
+far: opens as a maker or a taker, double-downs that raise a position's size class,
+closes with the cheapest cards that close the position (see closing.py), with an
+Ace, or with chips. Its children add one more legal move, or stop and play the set.
+Each simulation walks down the tree with UCT, then plays the set out on a fork of
+the game (see `GameState.fork`) where the cards the player hasn't seen, other hands
+and the deck, are dealt again at random. Every seat of the fork plays the auto
+Strategy: the rest of the round, then `horizon` more rounds. The reward is the
+player's change of chips.
+
+Statistics live in a TranspositionTable keyed by the public state, the player's
+hand and the set of moves: the same set reached in any order is the same node,
+and one table can be shared by seats, decisions and games.
+
+    python mcts.py -p 4 -n 20 --seats 0 --nodes 300
+    python mcts.py -p 4 -n 20 --seats 0 --budget 0.02
+"""
+
+from math import log, sqrt
+from random import Random
+from time import monotonic
+
+from atests import CHECK_OFF, CHECK_SAMPLED
+from card import FACES, LONGS, NUM_CARDS, VALUES, Card
+from closing import closing_cards
+from game import (
+    GameState,
+    apply_actions,
+    gameloop,
+    is_playing,
+    new_game,
+    play_round,
+    play_turn,
+    settle_round,
+)
+from orderbook import Orderbook
+from position import STONK_PAYOUT, PositionBook, get_close_cost, size_of
+from strategy import DEFAULT_PROFILE, Strategy, StrategyProfile
+from tournament import GameResult
+
+MAKE = 0
+"""Posts a card to the orderbook: (MAKE, (card,), NO_CARD)"""
+TAKE = 1
+"""Takes an order with a card: (TAKE, (card,), card of the order)"""
+CLOSE = 2
+"""Closes a position: (CLOSE, cards or () to pay chips, position id)"""
+DOUBLE = 3
+"""Doubles down on a position: (DOUBLE, (card,), position id)"""
+
+NO_CARD = -1
+
+Move = tuple[int, tuple[Card, ...], int]
+
+NODES = 300
+"""Simulations per decision"""
+HORIZON = 2
+"""Rounds played after the decision's round, in each simulation"""
+MAX_MOVES = 3
+"""Moves in one turn, the depth of the tree"""
+EXPLORATION = 1.0
+"""UCT constant, rewards are in STONK_PAYOUTs"""
+MAX_ENTRIES = 1 << 20
+
+PLAY_CLASSES: list[int] = [
+    (VALUES[card] + FACES[card]) * 2 + LONGS[card] for card in range(NUM_CARDS)
+]
+"""Cards of the same class play the same, the search only tries one of them"""
+
+
+class TranspositionTable:
+    """Visits and total reward per node, a node being (decision, moves, is_final)"""
+
+    stats: dict[tuple, list]
+    max_entries: int
+    """The table is cleared when it grows past it"""
+
+    def __repr__(self):
+        return f"[[TranspositionTable {len(self.stats)} nodes]]"
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.stats = {}
+        self.max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def get(self, key: tuple) -> list:
+        """[visits, total reward] of the node, a new entry if unseen"""
+        stats = self.stats.get(key)
+        if stats is None:
+            if len(self.stats) >= self.max_entries:
+                self.stats.clear()
+            stats = self.stats[key] = [0, 0.0]
+        return stats
+
+    def peek(self, key: tuple) -> list | None:
+        return self.stats.get(key)
+
+
+def decision_key(state: GameState, player_id: int, hand: list[Card]) -> tuple:
+    """What the player knows when deciding: the public state and its own hand"""
+    return (
+        player_id,
+        state.current_round,
+        tuple(state.Chips),
+        state.Blinds,
+        tuple((p.id, p.long, p.short, tuple(p.cards)) for p in state.Positions),
+        tuple((o.player_id, o.card) for o in state.Orderbook),
+        tuple(state.Public.kinds),
+        tuple(sorted(hand)),
+    )
+
+
+def legal_moves(
+    player_id: int,
+    hand: list[Card],
+    Positions: PositionBook,
+    Orderbook: Orderbook,
+    chips: int,
+    moves: frozenset[Move],
+) -> list[Move]:
+    """Moves the player can add to the `moves` already taken this turn"""
+    used = {card for _, cards, _ in moves for card in cards}
+    taken = {target for kind, _, target in moves if kind == TAKE}
+    closed = {target for kind, _, target in moves if kind == CLOSE}
+    doubled = {target for kind, _, target in moves if kind == DOUBLE}
+    for kind, cards, target in moves:
+        if kind == CLOSE and not cards:
+            chips -= get_close_cost(Positions.get(target))
+
+    left = [card for card in hand if card not in used]
+    cards = []
+    classes = set()
+    for card in left:
+        if PLAY_CLASSES[card] not in classes:
+            classes.add(PLAY_CLASSES[card])
+            cards.append(card)
+
+    legal = []
+    for card in cards:
+        legal.append((MAKE, (card,), NO_CARD))
+        for order in Orderbook:
+            if (
+                order.player_id != player_id
+                and order.card not in taken
+                and LONGS[order.card] != LONGS[card]
+            ):
+                legal.append((TAKE, (card,), order.card))
+        for position in Positions.of_player(player_id):
+            if (
+                position.id not in closed
+                and position.id not in doubled
+                and position.is_doubling(card, player_id)
+                and size_of(position.value_with(card)) > position.size
+            ):
+                legal.append((DOUBLE, (card,), position.id))
+
+    ace = next((card for card in left if VALUES[card] == 1), None)
+    for position in Positions.of_player(player_id):
+        if position.id in closed or position.id in doubled:
+            continue
+        if chips > get_close_cost(position):
+            legal.append((CLOSE, (), position.id))
+        closing = closing_cards(left, position, player_id)
+        if closing is not None:
+            legal.append((CLOSE, tuple(closing), position.id))
+        if ace is not None and closing != [ace]:
+            legal.append((CLOSE, (ace,), position.id))
+    return legal
+
+
+def as_actions(moves: frozenset[Move]) -> tuple[list, list, list]:
+    """Moves as the opens, closes and doubles of `Strategy.set_actions`"""
+    opens = []
+    closes = []
+    doubles = []
+    for kind, cards, target in sorted(moves):
+        if kind == MAKE:
+            opens.append((cards[0], None))
+        elif kind == TAKE:
+            opens.append((cards[0], target))
+        elif kind == DOUBLE:
+            doubles.append((cards[0], target))
+        else:
+            closes.append((target, list(cards) or None))
+    return opens, closes, doubles
+
+
+class MctsStrategy(Strategy):
+    """
+    Strategy searching each decision with MCTS, see the module's doc.
+    Needs the game it plays in, to fork it: copies of the Strategy, in a fork or
+    a snapshot of the game, still search that game.
+    """
+
+    state: GameState
+    table: TranspositionTable
+    rng: Random
+    """Deals the unseen cards and shuffles the forks' decks"""
+    nodes: int
+    """Simulations per decision, at most"""
+    budget: float | None
+    """Seconds per decision, at most"""
+    horizon: int
+    exploration: float
+    max_moves: int
+    simulations: int
+    """Simulations run over every decision"""
+
+    def __init__(
+        self,
+        player_id: int,
+        hand: list[Card],
+        state: GameState,
+        table: TranspositionTable | None = None,
+        nodes: int = NODES,
+        budget: float | None = None,
+        horizon: int = HORIZON,
+        seed: int | None = None,
+        profile: StrategyProfile = DEFAULT_PROFILE,
+    ):
+        super().__init__(player_id, hand, False, False, state.Public, profile)
+        self.state = state
+        self.table = table if table is not None else TranspositionTable()
+        self.rng = Random(seed)
+        self.nodes = nodes
+        self.budget = budget
+        self.horizon = horizon
+        self.exploration = EXPLORATION
+        self.max_moves = MAX_MOVES
+        self.simulations = 0
+
+    def compute_current_action(
+        self,
+        hand: list[Card],
+        Positions: PositionBook,
+        Chips: list[int],
+        Orderbook: Orderbook,
+        Blinds: int,
+    ) -> bool:
+        self.hand = hand
+        opens, closes, doubles = as_actions(self.search(hand))
+        return self.set_actions(opens, closes, Positions, Orderbook, doubles)
+
+    def search(self, hand: list[Card]) -> frozenset[Move]:
+        """Runs the simulations of the decision, returns the moves to play"""
+        root = decision_key(self.state, self.player_id, hand)
+        deadline = monotonic() + self.budget if self.budget else None
+        for _ in range(self.nodes):
+            if deadline and monotonic() > deadline:
+                break
+            path, moves = self.__select(root, hand)
+            reward = self.__rollout(moves)
+            for stats in path:
+                stats[0] += 1
+                stats[1] += reward
+            self.simulations += 1
+        return self.__best(root, hand)
+
+    def __children(self, root: tuple, hand: list[Card], moves: frozenset[Move]):
+        """Keys of the node's children: stopping first, then one more move"""
+        children = [(root, moves, True)]
+        if len(moves) < self.max_moves:
+            state = self.state
+            for move in legal_moves(
+                self.player_id,
+                hand,
+                state.Positions,
+                state.Orderbook,
+                state.Chips[self.player_id],
+                moves,
+            ):
+                children.append((root, moves | {move}, False))
+        return children
+
+    def __select(self, root: tuple, hand: list[Card]) -> tuple[list, frozenset]:
+        """
+        Walks down with UCT until a final node or a new one, which stops there.
+        Returns the stats on the path and the moves to play out
+        """
+        table = self.table
+        moves = frozenset()
+        path = [table.get((root, moves, False))]
+        while True:
+            visits = path[-1][0]
+            scale = self.exploration * sqrt(log(visits + 1))
+            best, best_score = None, (-1, 0.0)
+            for key in self.__children(root, hand, moves):
+                stats = table.peek(key)
+                if stats is None or stats[0] == 0:
+                    """Unvisited children first, in random order"""
+                    score = (1, self.rng.random())
+                else:
+                    score = (0, stats[1] / stats[0] + scale / sqrt(stats[0]))
+                if score > best_score:
+                    best, best_score = key, score
+            stats = table.get(best)
+            path.append(stats)
+            _, moves, is_final = best
+            if is_final or stats[0] == 0:
+                return path, moves
+
+    def __best(self, root: tuple, hand: list[Card]) -> frozenset[Move]:
+        """Follows the most visited children, until stopping is the most visited"""
+        moves = frozenset()
+        while True:
+            best, best_visits = None, 0
+            for key in self.__children(root, hand, moves):
+                stats = self.table.peek(key)
+                if stats and stats[0] > best_visits:
+                    best, best_visits = key, stats[0]
+            if best is None or best[2]:
+                return moves
+            moves = best[1]
+
+    def __rollout(self, moves: frozenset[Move]) -> float:
+        """Plays the moves out on a fork with the unseen cards dealt again"""
+        state = self.state
+        player_id = self.player_id
+        fork = state.fork(self.rng)
+        fork.check_level = CHECK_OFF
+        fork.ledger = None
+        self.__deal_unseen(fork)
+
+        for strategy in fork.Strategies:
+            """The fork's seats play the auto Strategy, searches don't nest"""
+            strategy.__class__ = Strategy
+        if moves:
+            strategy = fork.Strategies[player_id]
+            strategy.hand = fork.Hands[player_id].copy()
+            opens, closes, doubles = as_actions(moves)
+            strategy.set_actions(
+                opens, closes, fork.Positions, fork.Orderbook, doubles
+            )
+            apply_actions(fork, player_id, False)
+
+        total = fork.total_players
+        turn = (player_id - fork.current_round) % total
+        for i in range(turn + 1, total):
+            play_turn(fork, (i + fork.current_round) % total, False)
+        settle_round(fork)
+        for _ in range(self.horizon):
+            if not is_playing(fork):
+                break
+            play_round(fork)
+
+        return (fork.Chips[player_id] - state.Chips[player_id]) / STONK_PAYOUT
+
+    def __deal_unseen(self, fork: GameState):
+        """Shuffles the other hands and the deck together, deals the hands again"""
+        hands = [
+            (player_id, hand)
+            for player_id, hand in enumerate(fork.Hands)
+            if player_id != self.player_id and hand
+        ]
+        unseen = fork.Deck.cards
+        for _, hand in hands:
+            unseen.extend(hand)
+        self.rng.shuffle(unseen)
+        for player_id, hand in hands:
+            hand[:] = unseen[-len(hand) :]
+            del unseen[-len(hand) :]
+            fork.Strategies[player_id].update_state(hand, reset=True)
+
+
+def play_mcts_game(
+    seats: list[int],
+    num_players: int,
+    init_chips: int,
+    seed: int,
+    table: TranspositionTable | None = None,
+    nodes: int = NODES,
+    budget: float | None = None,
+    horizon: int = HORIZON,
+    check_level: int = CHECK_SAMPLED,
+) -> GameResult:
+    """Plays one game with MctsStrategies at `seats`, the auto Strategy elsewhere"""
+    state = new_game(num_players, init_chips, False, seed, check_level)
+    table = table if table is not None else TranspositionTable()
+    for player_id in seats:
+        state.Strategies[player_id] = MctsStrategy(
+            player_id,
+            state.Hands[player_id],
+            state,
+            table,
+            nodes,
+            budget,
+            horizon,
+            seed=seed + player_id,
+        )
+    Chips, rounds = gameloop(state)
+    return GameResult(seed, Chips, rounds)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    from tournament import Summary, game_seeds
+
+    parser = ArgumentParser(description="Plays MCTS seats against the auto Strategy")
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-c", "--chips", type=int, default=100)
+    parser.add_argument("-n", "--games", type=int, default=20)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--seats", type=int, nargs="*", default=[0])
+    parser.add_argument("--nodes", type=int, default=NODES, help="per decision")
+    parser.add_argument("--budget", type=float, default=None, help="seconds")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="rounds")
+    args = parser.parse_args()
+
+    table = TranspositionTable()
+    summary = Summary(args.players)
+    for seed in game_seeds(args.seed, args.games):
+        summary.add(
+            play_mcts_game(
+                args.seats,
+                args.players,
+                args.chips,
+                seed,
+                table,
+                args.nodes,
+                args.budget,
+                args.horizon,
+            )
+        )
+    print(summary.report())
+    print(table)
@@ -0,0 +1,79 @@
+from functools import lru_cache
+
+from card import BIG, CARD_IDS, FACE, KINDS, NUM_KINDS, SMALL
+from position import Position, get_payout_size
+
+
+Composition = tuple[int, ...]
+"""Number of unseen cards per kind, see KINDS"""
+
+DECK: Composition = tuple(KINDS.count(kind) for kind in range(NUM_KINDS))
+"""Composition of a full deck: per color, 12 small, 8 big and 6 face cards"""
+
+SIZE_CARDS = {SMALL: CARD_IDS["As"], BIG: CARD_IDS["7s"], FACE: CARD_IDS["Ks"]}
+"""One card per size class, a house position of that card has the same size"""
+
+PAYOUTS: list[list[int]] = [
+    [
+        get_payout_size(Position(0, -1, [SIZE_CARDS[size]]), SIZE_CARDS[market])
+        for market in (SMALL, BIG, FACE)
+    ]
+    for size in (SMALL, BIG, FACE)
+]
+"""Payout per position size, then per market card size. See `get_payout_size`"""
+
+
+class Odds:
+    """
+    Exact odds of the next market card, drawn uniformly from the unseen cards,
+    and the expected payouts they lead to.
+    """
+
+    __slots__ = ("unseen", "up", "down", "sizes", "payouts")
+
+    unseen: int
+    up: float
+    """Probability that the market card is long (black)"""
+    down: float
+    """Probability that the market card is short (red)"""
+    sizes: tuple[float, float, float]
+    """Probability of the market card per size class"""
+    payouts: tuple[float, float, float]
+    """
+    Expected payout of the long side of a position, per position size class.
+    The short side expects the opposite.
+    """
+
+    def __repr__(self):
+        return (
+            f"[[up:{self.up:.3f}, down:{self.down:.3f},"
+            f" payouts:{[round(p, 3) for p in self.payouts]}]]"
+        )
+
+    def __init__(self, composition: Composition):
+        self.unseen = unseen = sum(composition)
+        s_small, s_big, s_face, l_small, l_big, l_face = composition
+        self.down = (s_small + s_big + s_face) / unseen
+        self.up = (l_small + l_big + l_face) / unseen
+        self.sizes = (
+            (s_small + l_small) / unseen,
+            (s_big + l_big) / unseen,
+            (s_face + l_face) / unseen,
+        )
+        """Up moves pay the long side, down moves the short side"""
+        small, big, face = l_small - s_small, l_big - s_big, l_face - s_face
+        self.payouts = tuple(
+            (small * on_small + big * on_big + face * on_face) / unseen
+            for on_small, on_big, on_face in PAYOUTS
+        )
+
+
+@lru_cache(maxsize=1 << 16)
+def market_odds(composition: Composition) -> Odds:
+    """
+    Odds of the next market card given the unseen cards, memoised by composition.
+    When every card is known, the market card comes from a reshuffle: full deck odds.
+    """
+    if sum(composition) <= 0:
+        return market_odds(DECK)
+    return Odds(composition)
@@ -0,0 +1,131 @@
+from collections import deque
+from typing import Iterator
+
+from card import LONGS, VALUES, Card, card_str
+
+
+MAX_CARD_VALUE = 10
+
+
+class Order:
+    """A card resting in the orderbook, waiting for a taker (market maker)"""
+
+    __slots__ = ("id", "player_id", "card")
+
+    id: int
+    """Arrival number, unique within the orderbook"""
+    player_id: int
+    card: Card
+
+    def __repr__(self):
+        return f"[[P:{self.player_id}, card:{card_str(self.card)}]]"
+
+    def __init__(self, order_id: int, player_id: int, card: Card):
+        self.id = order_id
+        self.player_id = player_id
+        self.card = card
+
+
+class Orderbook:
+    """
+    Cards played to the orderbook this round, queued per color with price-time priority:
+    the best order of a color is the highest valued one, then the earliest to arrive.
+    Posting, taking and finding the best order are O(1).
+    """
+
+    orders: dict[int, Order]
+    """Resting orders by id, in arrival order"""
+
+    levels: tuple[list[deque[Order]], list[deque[Order]]]
+    """Queues of orders by color (0: short, 1: long), then by card value"""
+
+    cards: dict[Card, Order]
+    """Resting orders by card"""
+
+    counts: dict[int, int]
+    """Number of resting orders per player_id"""
+
+    next_id: int
+
+    def __repr__(self):
+        return repr(list(self.orders.values()))
+
+    def __init__(self):
+        self.orders = {}
+        self.levels = (
+            [deque() for _ in range(MAX_CARD_VALUE + 1)],
+            [deque() for _ in range(MAX_CARD_VALUE + 1)],
+        )
+        self.cards = {}
+        self.counts = {}
+        self.next_id = 0
+
+    def copy(self) -> "Orderbook":
+        """Same resting orders, Orders never change so they are shared"""
+        clone = Orderbook.__new__(Orderbook)
+        clone.orders = self.orders.copy()
+        clone.levels = tuple([level.copy() for level in levels] for levels in self.levels)
+        clone.cards = self.cards.copy()
+        clone.counts = self.counts.copy()
+        clone.next_id = self.next_id
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(self.orders.values())
+
+    def __contains__(self, order: Order) -> bool:
+        return self.orders.get(order.id) is order
+
+    def post(self, player_id: int, card: Card) -> Order:
+        """Rests the card in the orderbook, returns its Order"""
+        order = Order(self.next_id, player_id, card)
+        self.next_id += 1
+
+        self.orders[order.id] = order
+        self.levels[LONGS[card]][VALUES[card]].append(order)
+        self.cards[card] = order
+        self.counts[player_id] = self.counts.get(player_id, 0) + 1
+        return order
+
+    def take(self, order: Order):
+        """Removes the order from the orderbook, a taker matched it"""
+        del self.orders[order.id]
+        level = self.levels[LONGS[order.card]][VALUES[order.card]]
+        if level[0] is order:
+            level.popleft()
+        else:
+            level.remove(order)
+        del self.cards[order.card]
+        self.counts[order.player_id] -= 1
+
+    def best(self, is_long: bool, exclude: int | None = None) -> Order | None:
+        """
+        Best resting order of the given color, None if there's none.
+        Orders of player_id `exclude` are skipped, so a player in the free-for-all
+        variant never takes its own cards.
+        """
+        levels = self.levels[is_long]
+        for value in range(MAX_CARD_VALUE, 0, -1):
+            for order in levels[value]:
+                if order.player_id != exclude:
+                    return order
+        return None
+
+    def get(self, card: Card) -> Order | None:
+        """Resting order of the card, None if the card is not in the orderbook"""
+        return self.cards.get(card)
+
+    def count(self, player_id: int) -> int:
+        """Number of resting orders of the player"""
+        return self.counts.get(player_id, 0)
+
+    def clear(self):
+        self.orders.clear()
+        for levels in self.levels:
+            for level in levels:
+                level.clear()
+        self.cards.clear()
+        self.counts.clear()
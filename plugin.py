@@ -0,0 +1,374 @@
+"""
+Out of process strategies: bots written outside the engine, in any language,
+decide for their seats through a pipe.
+
+A plugin is a command that reads batches of decisions on stdin and writes their
+actions on stdout, one compact JSON array per line. Cards are ints, see card.py.
+
+    request:  [batch_id, [[decision_id, player_id, hand, chips, blinds,
+                           positions, orderbook, unseen], ...]]
+        positions: [[position_id, long, short, cards], ...]
+        orderbook: [[player_id, card], ...]
+        unseen: cards the player hasn't seen per kind, see odds.Composition
+    response: [batch_id, [[decision_id, opens, closes, doubles], ...]]
+        opens: [[card, card of the order to take, -1 to make one], ...]
+        closes: [[position_id, [card, ...] or a card, -1 to pay cash], ...]
+        doubles: [[card, position_id to double down on], ...], can be left out
+
+A PluginPool keeps a few processes of the plugin running across games. Tables play
+in threads, the decisions they ask while the workers are busy are sent together
+as one batch. Every decision has a time budget: the seat of a decision that misses
+it plays as the auto Strategy this turn, and a worker that misses it, crashes or
+answers garbage is restarted. The engine checks the actions it gets like any
+Strategy's, with `set_actions` then `test_strategy`.
+
+    python plugin.py -p 4 -n 200 --tables 8 -- python plugin.py --serve
+"""
+
+import json
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from itertools import count
+from queue import Empty, Queue
+from time import monotonic
+from typing import Callable, Iterator
+
+from atests import CHECK_SAMPLED
+from card import LONGS, Card
+from game import GameState, gameloop, new_game
+from orderbook import Orderbook
+from position import PositionBook
+from strategy import Strategy
+from tournament import GameResult
+
+BUDGET = 0.1
+"""Seconds per decision, from the request to the answer"""
+
+STARTUP = 5.0
+"""Seconds a new process has to answer its first batch, on top of the budget"""
+
+MAX_BATCH = 64
+
+NO_CARD = -1
+
+
+class PluginWorker:
+    """One process of the plugin, fed batches by its own thread"""
+
+    pool: "PluginPool"
+    process: subprocess.Popen
+    replies: Queue
+    """Lines written by the process, None once it exits"""
+    is_starting: bool
+    """No batch answered yet, the process may still be loading"""
+    thread: threading.Thread
+
+    def __init__(self, pool: "PluginPool"):
+        self.pool = pool
+        self.start_process()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def start_process(self):
+        self.process = subprocess.Popen(
+            self.pool.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.replies = Queue()
+        self.is_starting = True
+        threading.Thread(
+            target=read_lines, args=(self.process.stdout, self.replies), daemon=True
+        ).start()
+
+    def restart(self):
+        self.process.kill()
+        self.process.wait()
+        self.pool.count("restarts")
+        self.start_process()
+
+    def run(self):
+        pool = self.pool
+        while True:
+            batch = pool.next_batch()
+            if batch is None:
+                break
+            batch_id = next(pool.batch_ids)
+            deadline = max(deadline for _, _, deadline, _ in batch)
+            if self.is_starting:
+                deadline += STARTUP
+            request = [batch_id, [[i, *payload] for i, payload, _, _ in batch]]
+            futures = {i: future for i, _, _, future in batch}
+            try:
+                self.process.stdin.write(json.dumps(request, separators=(",", ":")))
+                self.process.stdin.write("\n")
+                line = self.replies.get(timeout=max(0.0, deadline - monotonic()))
+                reply_id, actions = json.loads(line)
+                if reply_id != batch_id:
+                    raise ValueError(f"Reply to batch {reply_id}, not {batch_id}")
+                for decision_id, opens, closes, *doubles in actions:
+                    doubles = doubles[0] if doubles else []
+                    futures.pop(decision_id).set_result((opens, closes, doubles))
+                self.is_starting = False
+            except (Empty, OSError, ValueError, TypeError, KeyError):
+                """Too slow, exited or garbage: the decisions left fall back"""
+                self.restart()
+            for future in futures.values():
+                future.set_result(None)
+        self.process.kill()
+
+
+def read_lines(stream, lines: Queue):
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+class PluginPool:
+    """Processes of a plugin, shared by every table and game"""
+
+    command: list[str]
+    budget: float
+    max_batch: int
+    requests: Queue
+    """Decisions waiting for a worker: id, payload, deadline, Future"""
+    workers: list[PluginWorker]
+    decision_ids: Iterator[int]
+    batch_ids: Iterator[int]
+    counters: dict[str, int]
+    """decisions, batches, timeouts, restarts, invalid"""
+    lock: threading.Lock
+
+    def __repr__(self):
+        return f"[[PluginPool {' '.join(self.command)}: {self.counters}]]"
+
+    def __init__(
+        self,
+        command: list[str],
+        workers: int = 2,
+        budget: float = BUDGET,
+        max_batch: int = MAX_BATCH,
+    ):
+        self.command = command
+        self.budget = budget
+        self.max_batch = max_batch
+        self.requests = Queue()
+        self.decision_ids = count()
+        self.batch_ids = count()
+        self.counters = dict.fromkeys(
+            ["decisions", "batches", "timeouts", "restarts", "invalid"], 0
+        )
+        self.lock = threading.Lock()
+        self.workers = [PluginWorker(self) for _ in range(workers)]
+
+    def count(self, counter: str, n: int = 1):
+        with self.lock:
+            self.counters[counter] += n
+
+    def decide(self, payload: list) -> Future:
+        future = Future()
+        deadline = monotonic() + self.budget
+        self.requests.put((next(self.decision_ids), payload, deadline, future))
+        return future
+
+    def next_batch(self) -> list | None:
+        """
+        Waits for a decision, then takes every other one waiting, up to max_batch.
+        Skips the decisions whose seat already fell back. None when closing
+        """
+        batch = []
+        while not batch:
+            request = self.requests.get()
+            if request is None:
+                return None
+            while True:
+                if request[3].set_running_or_notify_cancel():
+                    batch.append(request)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    request = self.requests.get_nowait()
+                except Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)
+                    break
+        self.count("decisions", len(batch))
+        self.count("batches")
+        return batch
+
+    def close(self):
+        for _ in self.workers:
+            self.requests.put(None)
+        for worker in self.workers:
+            worker.thread.join()
+
+
+class PluginStrategy(Strategy):
+    """Strategy of a seat played by a plugin, the auto Strategy when it fails"""
+
+    pool: PluginPool
+
+    def __init__(
+        self, pool: PluginPool, player_id: int, hand: list[Card], state: GameState
+    ):
+        super().__init__(player_id, hand, False, False, state.Public)
+        self.pool = pool
+
+    def compute_current_action(
+        self,
+        hand: list[Card],
+        Positions: PositionBook,
+        Chips: list[int],
+        Orderbook: Orderbook,
+        Blinds: int,
+    ) -> bool:
+        self.hand = hand
+        future = self.pool.decide(
+            [
+                self.player_id,
+                list(hand),
+                list(Chips),
+                Blinds,
+                [[p.id, p.long, p.short, list(p.cards)] for p in Positions],
+                [[o.player_id, o.card] for o in Orderbook],
+                self.composition,
+            ]
+        )
+        try:
+            reply = future.result(self.pool.budget)
+        except FutureTimeoutError:
+            future.cancel()
+            reply = None
+
+        if reply is None:
+            self.pool.count("timeouts")
+        else:
+            opens, closes, doubles = reply
+            try:
+                return self.set_actions(
+                    [(card, None if order < 0 else order) for card, order in opens],
+                    [(p, plugin_cards(cards)) for p, cards in closes],
+                    Positions,
+                    Orderbook,
+                    [(card, position_id) for card, position_id in doubles],
+                )
+            except (ValueError, TypeError):
+                self.pool.count("invalid")
+
+        return super().compute_current_action(hand, Positions, Chips, Orderbook, Blinds)
+
+
+def plugin_cards(cards: list[Card] | Card) -> list[Card] | None:
+    """Cards of a close sent by a plugin"""
+    if isinstance(cards, list):
+        return cards
+    return None if cards < 0 else [cards]
+
+
+def play_plugin_game(
+    pool: PluginPool,
+    seats: list[int],
+    num_players: int,
+    init_chips: int,
+    seed: int,
+    check_level: int = CHECK_SAMPLED,
+) -> GameResult:
+    """Plays one game with the plugin at `seats`, the auto Strategy elsewhere"""
+    state = new_game(num_players, init_chips, False, seed, check_level)
+    for player_id in seats:
+        hand = state.Hands[player_id]
+        state.Strategies[player_id] = PluginStrategy(pool, player_id, hand, state)
+    Chips, rounds = gameloop(state)
+    return GameResult(seed, Chips, rounds)
+
+
+def run_plugin_games(
+    pool: PluginPool,
+    seats: list[int],
+    num_players: int,
+    init_chips: int,
+    seeds: list[int],
+    tables: int = 8,
+    check_level: int = CHECK_SAMPLED,
+) -> Iterator[GameResult]:
+    """Plays the seeds on `tables` tables at once, in seed order"""
+    with ThreadPoolExecutor(tables) as executor:
+        yield from executor.map(
+            lambda seed: play_plugin_game(
+                pool, seats, num_players, init_chips, seed, check_level
+            ),
+            seeds,
+        )
+
+
+Decide = Callable[[list], tuple[list, list]]
+"""From the decision's fields after its id, to its opens and closes"""
+
+
+def example_decide(decision: list) -> tuple[list, list]:
+    """
+    Example plugin: bets the market moves towards the color with most unseen cards,
+    takes an order when it can, makes one otherwise. Never closes
+    """
+    player_id, hand, _, _, _, orderbook, unseen = decision
+    is_long = sum(unseen[3:]) > sum(unseen[:3])
+    for card in hand:
+        if LONGS[card] == is_long:
+            for order_player, order_card in orderbook:
+                if order_player != player_id and LONGS[order_card] != is_long:
+                    return [[card, order_card]], []
+            return [[card, NO_CARD]], []
+    return [], []
+
+
+def serve(decide: Decide = example_decide):
+    """Plugin side of the pipe: answers every batch read on stdin"""
+    for line in sys.stdin:
+        batch_id, decisions = json.loads(line)
+        actions = [[i, *decide(decision)] for i, *decision in decisions]
+        sys.stdout.write(json.dumps([batch_id, actions], separators=(",", ":")))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    from argparse import REMAINDER, ArgumentParser
+
+    from tournament import Summary, game_seeds
+
+    parser = ArgumentParser(description="Plays a plugin against the auto Strategy")
+    parser.add_argument("--serve", action="store_true", help="runs the example plugin")
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-c", "--chips", type=int, default=100)
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--seats", type=int, nargs="*", default=[0])
+    parser.add_argument("--tables", type=int, default=8, help="games at once")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="processes")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="seconds")
+    parser.add_argument("command", nargs=REMAINDER, help="the plugin, after --")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        sys.exit(0)
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    pool = PluginPool(command, args.workers, args.budget)
+    summary = Summary(args.players)
+    seeds = game_seeds(args.seed, args.games)
+    try:
+        for result in run_plugin_games(
+            pool, args.seats, args.players, args.chips, seeds, args.tables
+        ):
+            summary.add(result)
+    finally:
+        pool.close()
+    print(summary.report())
+    print(pool.counters)
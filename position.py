@@ -1,5 +1,8 @@
-from functools import reduce
-from card import get_value, is_big, is_face, is_long
+from collections import defaultdict
+from itertools import chain
+from typing import Iterable, Iterator
+
+from card import BIG, BIGS, FACE, FACES, LONGS, SMALL, VALUES, Card, cards_str, is_long
 
 
 SMALL_PAYOUT = 3
@@ -12,19 +15,125 @@ MAX_POSITION_VALUE = 10
 
 
 class Position:
+    __slots__ = (
+        "id",
+        "long",
+        "short",
+        "has_house",
+        "cards",
+        "long_sum",
+        "short_sum",
+        "value",
+        "is_big",
+        "is_face",
+        "size",
+    )
+
+    id: int
+    """Stable id, given by the PositionBook holding this position. -1 if none"""
     long: int  # index of player
     short: int  # index of player
     has_house: bool
-    cards: list[str]
+    cards: list[Card]
+
+    long_sum: int
+    """Sum of the values of the long (black) cards"""
+    short_sum: int
+    """Sum of the values of the short (red) cards"""
+    value: int
+    """Card value of the position, see `get_value_position`"""
+    is_big: bool
+    """Is the position big, ie. value over BIG_SIZE_CUTOFF"""
+    is_face: bool
+    """
+    Is the position worth a face card, ie. can it be paid a stonk.
+    Face positions share the blind pot, see `game.payout_blinds`
+    """
+    size: int
+    """Size class of the position, its payout tier: SMALL, BIG or FACE"""
 
     def __repr__(self):
-        return f"[[L:{self.long}, S:{self.short}, pos:{self.cards}]]"
+        return f"[[L:{self.long}, S:{self.short}, pos:{cards_str(self.cards)}]]"
 
-    def __init__(self, long: int, short: int, cards: list[str]):
+    def __init__(self, long: int, short: int, cards: list[Card]):
+        self.id = -1
         self.long = long
         self.short = short
         self.cards = cards
-        self.has_house = ((long + 1) * (short + 1)) == 0
+        self.has_house = has_house = ((long + 1) * (short + 1)) == 0
+
+        long_sum = 0
+        short_sum = 0
+        for card in cards:
+            if LONGS[card]:
+                long_sum += VALUES[card]
+            else:
+                short_sum += VALUES[card]
+        self.long_sum = long_sum
+        self.short_sum = short_sum
+
+        if has_house:
+            value = long_sum if long_sum > short_sum else short_sum
+        else:
+            value = long_sum if long_sum < short_sum else short_sum
+        self.value = value
+        self.is_big = value > BIG_SIZE_CUTOFF
+        self.is_face = value >= MAX_POSITION_VALUE
+        self.size = size_of(value)
+
+    def copy(self) -> "Position":
+        """Same position with its own pile, without rescanning the cards"""
+        clone = Position.__new__(Position)
+        clone.id = self.id
+        clone.long = self.long
+        clone.short = self.short
+        clone.has_house = self.has_house
+        clone.cards = self.cards.copy()
+        clone.long_sum = self.long_sum
+        clone.short_sum = self.short_sum
+        clone.value = self.value
+        clone.is_big = self.is_big
+        clone.is_face = self.is_face
+        clone.size = self.size
+        return clone
+
+    def add_card(self, card: Card):
+        """
+        Puts the card on the pile, keeping the sums and value up to date.
+        Piles grow with double-downs, the cards are never scanned again
+        """
+        self.cards.append(card)
+        if LONGS[card]:
+            self.long_sum += VALUES[card]
+        else:
+            self.short_sum += VALUES[card]
+        self.__revalue()
+
+    def value_with(self, card: Card) -> int:
+        """Value the position would have with the card on the pile, see `add_card`"""
+        long_sum = self.long_sum
+        short_sum = self.short_sum
+        if LONGS[card]:
+            long_sum += VALUES[card]
+        else:
+            short_sum += VALUES[card]
+        if self.has_house:
+            return long_sum if long_sum > short_sum else short_sum
+        return long_sum if long_sum < short_sum else short_sum
+
+    def is_doubling(self, card: Card, player_id: int) -> bool:
+        """Can the player double down with the card: on their own side of the pile"""
+        return self.is_player_long(player_id) == LONGS[card]
+
+    def __revalue(self):
+        """Derives value and size from the side sums"""
+        if self.has_house:
+            self.value = max(self.long_sum, self.short_sum)
+        else:
+            self.value = min(self.long_sum, self.short_sum)
+        self.is_big = self.value > BIG_SIZE_CUTOFF
+        self.is_face = self.value >= MAX_POSITION_VALUE
+        self.size = size_of(self.value)
 
     def has_player(self, player_id: int) -> bool:
         """
@@ -47,7 +156,96 @@ class Position:
             return -1
 
 
-def get_player_paid(market_card: str, position: Position) -> int:
+class PositionBook:
+    """
+    Open positions, indexed by stable id and by player.
+    Adding and removing a position is O(1), and iterating is in opening order.
+    """
+
+    positions: dict[int, Position]
+    """All open positions by id"""
+
+    longs: dict[int, dict[int, Position]]
+    """Positions where the player is long, by player_id, then by id. House is -1"""
+
+    shorts: dict[int, dict[int, Position]]
+    """Positions where the player is short, by player_id, then by id. House is -1"""
+
+    next_id: int
+
+    def __repr__(self):
+        return repr(list(self.positions.values()))
+
+    def __init__(self, positions: Iterable[Position] = ()):
+        self.positions = {}
+        self.longs = defaultdict(dict)
+        self.shorts = defaultdict(dict)
+        self.next_id = 0
+        for position in positions:
+            self.add(position)
+
+    def copy(self) -> "PositionBook":
+        """Copies of the positions, with the same ids"""
+        clone = PositionBook()
+        clone.next_id = self.next_id
+        positions, longs, shorts = clone.positions, clone.longs, clone.shorts
+        for position_id, position in self.positions.items():
+            position = positions[position_id] = position.copy()
+            longs[position.long][position_id] = position
+            shorts[position.short][position_id] = position
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator[Position]:
+        return iter(self.positions.values())
+
+    def __contains__(self, position: Position) -> bool:
+        return self.positions.get(position.id) is position
+
+    def add(self, position: Position) -> int:
+        """Adds the position to the book, returns its new id"""
+        position_id = position.id = self.next_id
+        self.next_id += 1
+
+        self.positions[position_id] = position
+        self.longs[position.long][position_id] = position
+        self.shorts[position.short][position_id] = position
+        return position_id
+
+    def remove(self, position: Position):
+        position_id = position.id
+        del self.positions[position_id]
+        del self.longs[position.long][position_id]
+        del self.shorts[position.short][position_id]
+
+    def get(self, position_id: int) -> Position | None:
+        return self.positions.get(position_id)
+
+    def of_player(self, player_id: int) -> Iterable[Position]:
+        """Positions of the player: long ones first, then short ones"""
+        return chain(self.longs[player_id].values(), self.shorts[player_id].values())
+
+    def long_of(self, player_id: int) -> Iterable[Position]:
+        return self.longs[player_id].values()
+
+    def short_of(self, player_id: int) -> Iterable[Position]:
+        return self.shorts[player_id].values()
+
+    def count(self, player_id: int) -> int:
+        """Number of positions of the player"""
+        return len(self.longs[player_id]) + len(self.shorts[player_id])
+
+
+def size_of(value: int) -> int:
+    """Size class of a position of that value: SMALL, BIG or FACE"""
+    if value >= MAX_POSITION_VALUE:
+        return FACE
+    return BIG if value > BIG_SIZE_CUTOFF else SMALL
+
+
+def get_player_paid(market_card: Card, position: Position) -> int:
     """Given a market_card, get the id of the player getting paid"""
     if is_long(market_card):
         return position.long
@@ -57,41 +255,34 @@ def get_player_paid(market_card: str, position: Position) -> int:
 
 def get_value_position(position: Position) -> int:
     """Returns the card value of the position"""
-    long_sum = 0
-    short_sum = 0
-    for c in position.cards:
-        if is_long(c):
-            long_sum += get_value(c)
-        else:
-            short_sum += get_value(c)
+    return position.value
 
-    if position.has_house:
-        return max(long_sum, short_sum)
-    else:
-        return min(long_sum, short_sum)
+
+def iter_cards(positions: Iterable[Position]) -> Iterator[Card]:
+    """Given Positions, streams their cards without building intermediate lists"""
+    return chain.from_iterable(p.cards for p in positions)
 
 
-def flat_positions(positions: list[Position]) -> list[str]:
-    """Given a list of Positions, returns the flat list of the cards"""
-    return reduce(lambda a, v: v.cards + a, positions, [])
+def flat_positions(positions: Iterable[Position]) -> list[Card]:
+    """Given Positions, returns the flat list of the cards"""
+    return list(iter_cards(positions))
 
 
 def get_close_cost(position: Position) -> int:
     """Returns the cost of closing a position"""
-    if get_value_position(position) > BIG_SIZE_CUTOFF:
+    if position.is_big:
         return BIG_PAYOUT
     else:
         return MID_PAYOUT
 
 
-def get_payout_size(position: Position, market_card: str) -> int:
+def get_payout_size(position: Position, market_card: Card) -> int:
     """Returns the payout size of a position, according to game's rules"""
-    position_value = get_value_position(position)
-    is_big_position = position_value > BIG_SIZE_CUTOFF
-    is_big_market = is_big(market_card)
+    is_big_position = position.is_big
+    is_big_market = BIGS[market_card]
 
     if is_big_market and is_big_position:
-        if position_value >= MAX_POSITION_VALUE and is_face(market_card):
+        if position.is_face and FACES[market_card]:
             return STONK_PAYOUT
         else:
             return BIG_PAYOUT
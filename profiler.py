@@ -0,0 +1,206 @@
+"""
+Per phase timing of the game loop, and optionally where it allocates memory.
+
+A GameState with a Profiler laps it as the round goes: each lap charges the time
+since the previous one to a phase. Without a profiler the engine does one `if` per
+phase, like tracing.
+
+    python profiler.py -p 5 -n 200                 # summary table
+    python profiler.py -p 5 -n 50 --malloc -o profile.json
+"""
+
+import tracemalloc
+from time import perf_counter_ns
+
+PHASE_CHECKS = 0
+"""Invariant checks of the round: `game_card_number`, or the ledger's"""
+PHASE_BLIND = 1
+"""`pay_blind`"""
+PHASE_STRATEGY = 2
+"""Strategy decisions: `compute_current_action`, also timed per player"""
+PHASE_VALIDATION = 3
+"""Checks of the actions: `test_strategy`, `players_limited_cards` or the ledger's"""
+PHASE_ACTIONS = 4
+"""Actions taken: orders posted, positions opened and closed"""
+PHASE_HOUSE = 5
+"""`match_algo_house`"""
+PHASE_MARKET = 6
+"""Market card drawn and revealed"""
+PHASE_PAYOUTS = 7
+"""`pay_positions`"""
+PHASE_BLINDS = 8
+"""`payout_blinds`"""
+PHASE_BANKRUPTCY = 9
+"""Positions and hands of bankrupt players"""
+
+PHASE_NAMES = [
+    "checks",
+    "blind",
+    "strategy",
+    "validation",
+    "actions",
+    "house",
+    "market",
+    "payouts",
+    "blinds",
+    "bankruptcy",
+]
+
+
+class Profiler:
+    """
+    Wall time and laps per phase, and per player for Strategy calls.
+    With `malloc`, tracemalloc also attributes to each phase the most memory it
+    held above what was allocated when it started (its peak).
+    Accumulates over every round and game it is given to.
+    """
+
+    ns: list[int]
+    """Wall time per phase"""
+    calls: list[int]
+    """Laps per phase"""
+    peak_bytes: list[int]
+    """Sum of the memory peaks per phase, with `malloc`"""
+    strategy_ns: list[int]
+    strategy_calls: list[int]
+    """Time and calls of `compute_current_action` per player_id"""
+    rounds: int
+    malloc: bool
+    owns_tracing: bool
+    """Did this profiler start tracemalloc, `stop` leaves a caller's session on"""
+    last: int
+    """perf_counter_ns of the last lap"""
+    memory: int
+    """Memory allocated at the last lap, with `malloc`"""
+
+    def __repr__(self):
+        return f"[[Profiler rounds:{self.rounds}, ns:{sum(self.ns)}]]"
+
+    def __init__(self, malloc: bool = False):
+        self.ns = [0] * len(PHASE_NAMES)
+        self.calls = [0] * len(PHASE_NAMES)
+        self.peak_bytes = [0] * len(PHASE_NAMES)
+        self.strategy_ns = []
+        self.strategy_calls = []
+        self.rounds = 0
+        self.malloc = malloc
+        self.last = 0
+        self.memory = 0
+        self.owns_tracing = malloc and not tracemalloc.is_tracing()
+        if self.owns_tracing:
+            tracemalloc.start()
+
+    def start(self):
+        """Round starts, time and memory before it are not charged to any phase"""
+        self.rounds += 1
+        if self.malloc:
+            self.memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.last = perf_counter_ns()
+
+    def lap(self, phase: int):
+        """Charges the time since the last lap to `phase`"""
+        now = perf_counter_ns()
+        self.ns[phase] += now - self.last
+        self.calls[phase] += 1
+        if self.malloc:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes[phase] += peak - self.memory
+            self.memory = current
+            tracemalloc.reset_peak()
+            now = perf_counter_ns()
+        self.last = now
+
+    def lap_strategy(self, player_id: int):
+        """Charges the time since the last lap to the Strategy of `player_id`"""
+        start = self.last
+        self.lap(PHASE_STRATEGY)
+        while len(self.strategy_ns) <= player_id:
+            self.strategy_ns.append(0)
+            self.strategy_calls.append(0)
+        self.strategy_ns[player_id] += self.last - start
+        self.strategy_calls[player_id] += 1
+
+    def stop(self):
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+
+    def counters(self) -> dict:
+        """Every counter, as plain JSON-able dicts"""
+        return {
+            "rounds": self.rounds,
+            "phases": {
+                name: {
+                    "calls": self.calls[phase],
+                    "ns": self.ns[phase],
+                    "peak_bytes": self.peak_bytes[phase],
+                }
+                for phase, name in enumerate(PHASE_NAMES)
+            },
+            "strategies": [
+                {"player_id": player_id, "calls": calls, "ns": ns}
+                for player_id, (calls, ns) in enumerate(
+                    zip(self.strategy_calls, self.strategy_ns)
+                )
+            ],
+        }
+
+    def report(self) -> str:
+        total = sum(self.ns) or 1
+        lines = [
+            f"Rounds {self.rounds}, {total / max(self.rounds, 1) / 1000:.1f} us/round",
+            f"{'phase':<12}{'calls':>10}{'ms':>10}{'us/call':>10}{'share':>8}"
+            + (f"{'peak KiB':>10}" if self.malloc else ""),
+        ]
+        for phase, name in enumerate(PHASE_NAMES):
+            calls, ns = self.calls[phase], self.ns[phase]
+            line = (
+                f"{name:<12}{calls:>10}{ns / 1e6:>10.1f}"
+                f"{ns / max(calls, 1) / 1000:>10.2f}{ns / total:>8.1%}"
+            )
+            if self.malloc:
+                line += f"{self.peak_bytes[phase] / 1024:>10.1f}"
+            lines.append(line)
+        for player_id, (calls, ns) in enumerate(
+            zip(self.strategy_calls, self.strategy_ns)
+        ):
+            lines.append(
+                f"  Strategy {player_id}: {calls} calls,"
+                f" {ns / max(calls, 1) / 1000:.2f} us/call"
+            )
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import json
+    from argparse import ArgumentParser
+
+    from atests import CHECK_FULL
+    from game import gameloop, new_game
+    from tournament import game_seeds
+
+    parser = ArgumentParser(description="Profiles the phases of seeded games")
+    parser.add_argument("-p", "--players", type=int, default=5)
+    parser.add_argument("-c", "--chips", type=int, default=100)
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument(
+        "--check", type=int, default=CHECK_FULL, help="see CHECK_* in atests"
+    )
+    parser.add_argument("--malloc", action="store_true", help="traces allocations")
+    parser.add_argument("-o", "--output", default=None, help="JSON counters file")
+    args = parser.parse_args()
+
+    profiler = Profiler(args.malloc)
+    for seed in game_seeds(args.seed, args.games):
+        state = new_game(
+            args.players, args.chips, False, seed, args.check, profiler=profiler
+        )
+        gameloop(state)
+    profiler.stop()
+
+    print(profiler.report())
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(profiler.counters(), file, indent=2)
@@ -0,0 +1,438 @@
+"""
+Game server: hosts many tables at once, players connect to it with `client.py`.
+
+Every table plays in its own thread, the asyncio loop only moves messages,
+so a table waiting on a human or busy with its bots never holds up another table.
+Every seat is a SeatStrategy: a bot, until a client joins it, and a bot again
+when the client leaves or doesn't answer in time (the client is unseated then).
+After MAX_INVALID_REPLIES invalid answers to a turn, the bot plays that turn.
+
+Protocol: one JSON object per line, both ways. Requests have an "op":
+- {"op": "create", "players": 5, "chips": 500, "humans": 1, "seed": null}
+    Opens a table, it starts once `humans` seats are joined
+- {"op": "list"}
+- {"op": "join", "table": 0, "seat": 0}
+- {"op": "leave", "table": 0}
+- {"op": "watch", "table": 0}
+- {"op": "act", "table": 0, "open": [{"card": "Ah", "take": "Ks"}, {"card": "9c",
+    "double": 4}], "close": [{"position": 3, "cards": ["4h", "2d"]}, {"position": 5}]}
+    Answers a turn. `take` null posts the card to the orderbook, `double` doubles
+    down on that position. No `cards` (or one "card") closes the position with chips.
+    No actions passes.
+The server answers requests with {"ok": op, ...} or {"error": message}, and sends
+{"event": "turn", ...} when a seat has to act, {"event": "trace", ...} for what
+happens at the table (see tracing), and {"event": "end", ...}.
+
+    python server.py --port 7373
+    python server.py --unix /tmp/stonks.sock
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from atests import CHECK_SAMPLED
+from card import CARD_IDS, CARDS, Card, cards_str
+from game import CARDS_PER_PLAYER, GameState, is_playing, new_game, play_round
+from orderbook import Orderbook
+from position import Position, PositionBook
+from strategy import Strategy
+from tracing import DEAL, END, TRACE_ACTION, Event, Tracer, event_dict, event_str
+
+TURN_TIMEOUT = 60.0
+"""Seconds a client has to answer a turn, the seat passes after that"""
+
+MAX_TABLES = 64
+
+MAX_INVALID_REPLIES = 3
+"""Answers to one turn that break the rules, the bot plays the turn after that"""
+
+MAX_PLAYERS = len(CARDS) // CARDS_PER_PLAYER - 1
+"""Every player and the house can be dealt a hand, see `new_game`"""
+
+
+class SeatStrategy(Strategy):
+    """
+    Strategy of a seat at a server table: asks the client sitting at it,
+    plays as the auto Strategy when nobody does.
+    """
+
+    table: "Table"
+    client: "Connection | None"
+
+    def __init__(
+        self, table: "Table", player_id: int, hand: list[Card], state: GameState
+    ):
+        super().__init__(player_id, hand, False, False, state.Public)
+        self.table = table
+        self.client = None
+
+    def compute_current_action(
+        self,
+        hand: list[Card],
+        Positions: PositionBook,
+        Chips: list[int],
+        Orderbook: Orderbook,
+        Blinds: int,
+    ) -> bool:
+        client = self.client
+        if client is None:
+            return super().compute_current_action(
+                hand, Positions, Chips, Orderbook, Blinds
+            )
+
+        turn = {
+            "event": "turn",
+            "table": self.table.id,
+            "round": self.table.state.current_round,
+            "seat": self.player_id,
+            "hand": cards_str(hand),
+            "chips": list(Chips),
+            "blinds": Blinds,
+            "positions": [position_dict(p) for p in Positions],
+            "orderbook": [
+                {"player": o.player_id, "card": CARDS[o.card]} for o in Orderbook
+            ],
+            "count": self.count,
+            "odds": {"up": self.odds.up, "down": self.odds.down},
+        }
+        for _ in range(MAX_INVALID_REPLIES):
+            self.hand = hand.copy()
+            reply = self.table.ask(client, turn)
+            if reply is None:
+                """No answer in time, or the client left: the bot takes the seat"""
+                if self.client is client:
+                    self.client = None
+                    message = f"No answer in time, seat {self.player_id} is a bot"
+                    self.table.send(client, {"error": message, "table": self.table.id})
+                break
+            try:
+                opens = [
+                    (parse_name(a.get("card")), parse_name(a.get("take")))
+                    for a in reply.get("open", [])
+                    if "double" not in a
+                ]
+                doubles = [
+                    (parse_name(a.get("card")), a["double"])
+                    for a in reply.get("open", [])
+                    if "double" in a
+                ]
+                closes = [
+                    (a.get("position", -1), parse_names(a))
+                    for a in reply.get("close", [])
+                ]
+                return self.set_actions(opens, closes, Positions, Orderbook, doubles)
+            except ValueError as error:
+                self.table.send(client, {"error": str(error), "table": self.table.id})
+
+        return super().compute_current_action(hand, Positions, Chips, Orderbook, Blinds)
+
+
+def parse_name(name: str | None) -> Card | None:
+    """Card of a name sent by a client, None for null. Raises ValueError"""
+    if name is None:
+        return None
+    card = CARD_IDS.get(name)
+    if card is None:
+        raise ValueError(f"{name} is not a card")
+    return card
+
+
+def parse_names(action: dict) -> list[Card] | None:
+    """Cards of a close sent by a client: its "cards", or its one "card" """
+    names = action.get("cards")
+    if names is None:
+        card = parse_name(action.get("card"))
+        return None if card is None else [card]
+    if not isinstance(names, list) or not names:
+        raise ValueError(f"{names} is not a list of cards")
+    return [parse_name(name) for name in names]
+
+
+def position_dict(position: Position) -> dict:
+    return {
+        "id": position.id,
+        "long": position.long,
+        "short": position.short,
+        "cards": cards_str(position.cards),
+        "value": position.value,
+    }
+
+
+class Table:
+    """A game played in its own thread, its seats and watchers"""
+
+    id: int
+    state: GameState
+    seats: list[SeatStrategy]
+    watchers: set["Connection"]
+    humans: int
+    """Seats to be joined before the game starts"""
+    delay: float
+    """Seconds between rounds, so watchers can follow bot only tables"""
+    started: threading.Event
+    finished: bool
+    loop: asyncio.AbstractEventLoop
+    thread: threading.Thread
+
+    def __repr__(self):
+        return f"[[Table {self.id}: {self.joined}/{len(self.seats)} joined]]"
+
+    def __init__(
+        self,
+        table_id: int,
+        num_players: int,
+        init_chips: int,
+        humans: int,
+        seed: int | None,
+        delay: float,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self.id = table_id
+        self.seats = []
+        self.watchers = set()
+        self.humans = humans
+        self.delay = delay
+        self.started = threading.Event()
+        self.finished = False
+        self.loop = loop
+
+        tracer = Tracer(TRACE_ACTION, self.__trace)
+        self.state = state = new_game(
+            num_players, init_chips, False, seed, CHECK_SAMPLED, tracer=tracer
+        )
+        self.seats = [
+            SeatStrategy(self, player_id, state.Hands[player_id], state)
+            for player_id in range(num_players)
+        ]
+        state.Strategies = self.seats
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        if humans == 0:
+            self.started.set()
+
+    @property
+    def joined(self) -> int:
+        return sum(seat.client is not None for seat in self.seats)
+
+    def info(self) -> dict:
+        return {
+            "table": self.id,
+            "players": len(self.seats),
+            "free": [s.player_id for s in self.seats if s.client is None],
+            "started": self.started.is_set(),
+            "round": self.state.current_round,
+        }
+
+    def join(self, client: "Connection", seat: int):
+        if not 0 <= seat < len(self.seats):
+            raise ValueError(f"No seat {seat} at table {self.id}")
+        if self.seats[seat].client is not None:
+            raise ValueError(f"Seat {seat} is taken")
+        self.seats[seat].client = client
+        if self.joined >= self.humans:
+            self.started.set()
+
+    def leave(self, client: "Connection"):
+        """The client's seats go back to the bots"""
+        for seat in self.seats:
+            if seat.client is client:
+                seat.client = None
+        self.watchers.discard(client)
+
+    def run(self):
+        """Plays the game, in the table's thread"""
+        self.started.wait()
+        state = self.state
+        try:
+            while is_playing(state):
+                play_round(state)
+                if self.delay:
+                    time.sleep(self.delay)
+            state.tracer.emit(END, state.current_round, value=state.current_round)
+            chips = list(state.Chips)
+            self.broadcast({"event": "end", "table": self.id, "chips": chips})
+        except Exception as error:
+            self.broadcast({"event": "end", "table": self.id, "error": repr(error)})
+        finally:
+            self.finished = True
+
+    def ask(self, client: "Connection", turn: dict) -> dict | None:
+        """Sends the turn to the client, waits for its answer in the table's thread"""
+        future = asyncio.run_coroutine_threadsafe(client.ask(self.id, turn), self.loop)
+        try:
+            return future.result(TURN_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            return None
+
+    def send(self, client: "Connection", message: dict):
+        """Thread safe: writes happen in the loop"""
+        self.loop.call_soon_threadsafe(client.send, message)
+
+    def broadcast(self, message: dict):
+        for client in self.clients():
+            self.send(client, message)
+
+    def clients(self) -> set["Connection"]:
+        clients = set(self.watchers)
+        clients.update(seat.client for seat in self.seats if seat.client)
+        return clients
+
+    def __trace(self, event: Event):
+        kind, _, player, *_ = event
+        message = event_dict(event)
+        message.update({"event": "trace", "table": self.id, "text": event_str(event)})
+        for client in self.clients():
+            """Dealt cards are private"""
+            if kind != DEAL or self.seats[player].client is client:
+                self.send(client, message)
+
+
+class Connection:
+    """A client connected to the server, it may sit and watch at several tables"""
+
+    writer: asyncio.StreamWriter
+    pending: dict[int, asyncio.Future]
+    """Turns waiting for an answer, per table"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.pending = {}
+
+    def send(self, message: dict):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b"\n")
+
+    async def ask(self, table_id: int, turn: dict) -> dict | None:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[table_id] = future
+        self.send(turn)
+        try:
+            return await future
+        finally:
+            self.pending.pop(table_id, None)
+
+    def answer(self, table_id: int, reply: dict | None):
+        future = self.pending.get(table_id)
+        if future is None or future.done():
+            raise ValueError(f"No turn to answer at table {table_id}")
+        future.set_result(reply)
+
+    def close(self):
+        """Pending turns pass"""
+        for future in self.pending.values():
+            if not future.done():
+                future.set_result(None)
+
+
+class GameServer:
+    tables: dict[int, Table]
+    next_id: int
+    delay: float
+
+    def __init__(self, delay: float = 0.0):
+        self.tables = {}
+        self.next_id = 0
+        self.delay = delay
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = Connection(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    client.send(self.request(client, json.loads(line)))
+                except (ValueError, KeyError, TypeError) as error:
+                    client.send({"error": str(error)})
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            """Client gone, or server shutting down"""
+        finally:
+            client.close()
+            for table in self.tables.values():
+                table.leave(client)
+            writer.close()
+
+    def request(self, client: Connection, request: dict) -> dict:
+        """Handles one request, in the loop. Raises ValueError for bad requests"""
+        op = request["op"]
+        self.tables = {i: t for i, t in self.tables.items() if not t.finished}
+
+        if op == "create":
+            if len(self.tables) >= MAX_TABLES:
+                raise ValueError("Too many tables")
+            players = int(request.get("players", 5))
+            chips = int(request.get("chips", 500))
+            humans = int(request.get("humans", 1))
+            if not 2 <= players <= MAX_PLAYERS:
+                raise ValueError(f"Tables have 2 to {MAX_PLAYERS} players")
+            if not 0 <= humans <= players:
+                raise ValueError(f"Tables have 0 to {players} humans")
+            if chips <= 0:
+                raise ValueError("Players start with some chips")
+            table = Table(
+                self.next_id,
+                players,
+                chips,
+                humans,
+                request.get("seed"),
+                float(request.get("delay", self.delay)),
+                asyncio.get_running_loop(),
+            )
+            self.tables[table.id] = table
+            self.next_id += 1
+            return {"ok": op, **table.info()}
+
+        if op == "list":
+            return {"ok": op, "tables": [t.info() for t in self.tables.values()]}
+
+        table = self.tables.get(request.get("table"))
+        if table is None:
+            raise ValueError(f"No table {request.get('table')}")
+
+        if op == "join":
+            table.join(client, int(request["seat"]))
+        elif op == "leave":
+            table.leave(client)
+            if table.id in client.pending:
+                client.answer(table.id, None)
+        elif op == "watch":
+            table.watchers.add(client)
+        elif op == "act":
+            client.answer(table.id, request)
+        else:
+            raise ValueError(f"Unknown op {op}")
+        return {"ok": op, **table.info()}
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 7373,
+    unix: str | None = None,
+    delay: float = 0.0,
+):
+    server = GameServer(delay)
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, unix)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Hosts game tables for client.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7373)
+    parser.add_argument("--unix", default=None, help="Unix socket path, not TCP")
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="seconds between rounds"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.unix, args.delay))
@@ -1,57 +1,186 @@
-from functools import reduce
 from random import random as R
 import sys
-from card import get_value, is_long
-from position import Position, get_close_cost
+from typing import Iterable
+from atests import Ok
+from card import (
+    KINDS,
+    LONGS,
+    NUM_CARDS,
+    NUM_KINDS,
+    Card,
+    card_str,
+    cards_str,
+    parse_card,
+)
+from closing import closing_cards, is_closing
+from orderbook import Order, Orderbook
+from position import Position, PositionBook, get_close_cost, size_of
+from odds import DECK, Composition, Odds, market_odds
+from evtable import EV_TABLE, Payouts
+from tracker import PublicCards
+
+
+class StrategyProfile:
+    """
+    Biases and thresholds of an auto Strategy, the knobs `tune` searches.
+    The default profile plays like an unbiased Strategy.
+    """
+
+    L: float
+    """Long bias, see `Strategy.L`"""
+    A: float
+    """Active bias, see `Strategy.A`"""
+    open_threshold: float
+    """Confidence needed to open a position, and to be a market maker"""
+    cash_threshold: float
+    """Confidence needed to close a position with cash"""
+
+    def __repr__(self):
+        return (
+            f"[[Profile L:{self.L:.3f}, A:{self.A:.3f},"
+            f" open:{self.open_threshold:.4f}, cash:{self.cash_threshold:.4f}]]"
+        )
+
+    def __init__(
+        self,
+        L: float = 0.5,
+        A: float = 0.5,
+        open_threshold: float = 0.01,
+        cash_threshold: float = 0.1,
+    ):
+        Ok(0 <= L <= 1 and 0 <= A <= 1, "Profile Error: biases out of [0,1]")
+        Ok(
+            0 <= open_threshold <= 1 and 0 <= cash_threshold <= 1,
+            "Profile Error: thresholds out of [0,1]",
+        )
+        self.L = L
+        self.A = A
+        self.open_threshold = open_threshold
+        self.cash_threshold = cash_threshold
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "L": self.L,
+            "A": self.A,
+            "open_threshold": self.open_threshold,
+            "cash_threshold": self.cash_threshold,
+        }
+
+    def active_threshold(self, threshold: float) -> float:
+        """
+        Threshold of `is_active` after the active bias:
+        - A = 1: 0, always acts
+        - A = 0.5: the threshold itself
+        - A = 0: 1, never acts
+        """
+        if self.A >= 1:
+            return 0.0
+        return threshold ** (self.A / (1 - self.A))
+
+
+DEFAULT_PROFILE = StrategyProfile()
 
 
 class Strategy:
     player_id: int
     is_agent: bool = False
-    hand: list[str] = []
+    hand: list[Card] = []
     """My hand in the current round"""
 
-    open_cards: dict[str, Position | str | None]
+    open_cards: dict[Card, Position | Order | None]
     """
     Return type, action taken: cards from hand to play.
-    Dict mapping card (str) to either:
+    Dict mapping card to either:
     - Position: existing Position (double down)
-    - str: create a new position (market taker).
-        format: card + "_" + other_player_id 
+    - Order: create a new position with an order of the Orderbook (market taker)
     - None: submit the card to the orderbook (market maker)
     """
 
-    close_cards: dict[Position, str | None]
+    close_cards: dict[Position, list[Card] | None]
     """
     Return type, action taken: existing positions to close.
     Dict mapping Position to either:
-    - str: Card in the player's hand
+    - list[Card]: Cards in the player's hand that close it, see `is_closing`
     - None: will pay cash to close the position
     """
 
-    count: int
-    """
-    Current count of color seen:
-    - Black +1
-    - Red -1
-    """
+    public: PublicCards
+    """Cards every player has seen, shared with the other Strategies of the game"""
+
+    hand_count: int
+    hand_seen: int
+    hand_kinds: list[int]
+    """Count, number and kinds of the cards only I have seen: my hand"""
 
     @property
-    def expects_long(self) -> bool:
-        """Expect mean reversion, so I expect to be long if my count is negative"""
-        return self.count < 0
+    def count(self) -> int:
+        """
+        Current count of color seen:
+        - Black +1
+        - Red -1
+        """
+        return self.public.count + self.hand_count
 
-    len_d: int = 52
-    """Number of unknown cards (roughly len(Deck))"""
+    @property
+    def len_d(self) -> int:
+        """Number of unknown cards (roughly len(Deck))"""
+        return NUM_CARDS - self.public.seen - self.hand_seen
+
+    @property
+    def composition(self) -> Composition:
+        """Number of cards I haven't seen per kind, see KINDS"""
+        return tuple(
+            deck - public - hand
+            for deck, public, hand in zip(DECK, self.public.kinds, self.hand_kinds)
+        )
+
+    @property
+    def odds(self) -> Odds:
+        """Exact odds of the next market card, from the cards I haven't seen"""
+        return market_odds(self.composition)
 
-    def update_state(self, new_cards: list[str], reset=False):
+    @property
+    def payouts(self) -> Payouts:
+        """Expected payout of a long position per size class, see evtable"""
+        return EV_TABLE.payouts(self.composition)
+
+    def expected_payout(
+        self, position: Position, payouts: Payouts | None = None
+    ) -> float:
+        """Expected payout of my side of the position, on the next market move"""
+        if payouts is None:
+            payouts = self.payouts
+        payout = payouts[position.size]
+        return payout if position.is_player_long(self.player_id) else -payout
+
+    @property
+    def expects_long(self) -> bool:
+        """
+        Expect mean reversion, so I expect to be long if my count is negative.
+        The long bias moves the cutoff: from always short (L=0) to always long (L=1).
+        """
+        return self.count < (2 * self.L - 1) * (NUM_CARDS + 1)
+
+    def update_state(self, new_cards: list[Card], reset=False):
+        """Cards dealt to my hand, public cards are seen through `public`"""
         if reset:
-            self.count = 0
-            self.len_d = 52
+            self.hand_count = 0
+            self.hand_seen = 0
+            self.hand_kinds = [0] * NUM_KINDS
 
-        self.len_d -= len(new_cards)
+        self.hand_seen += len(new_cards)
         for card in new_cards:
-            self.count += is_long(card) or -1
+            self.hand_count += LONGS[card] or -1
+            self.hand_kinds[KINDS[card]] += 1
+
+    def reveal(self, cards: list[Card]):
+        """My cards were played, `public` counts them from now on"""
+        self.hand_seen -= len(cards)
+        for card in cards:
+            self.hand_count -= LONGS[card] or -1
+            self.hand_kinds[KINDS[card]] -= 1
+
+    profile: StrategyProfile
 
     L: float
     """
@@ -69,6 +198,10 @@ class Strategy:
     - 0: Never acts
     """
 
+    open_threshold: float
+    cash_threshold: float
+    """Thresholds of `is_active` from the profile, after the active bias"""
+
     # G: float
     # """
     # Gullible bias: will update its EV based on other player's positions
@@ -102,6 +235,9 @@ class Strategy:
             - `P[~color | (count, len_d)] = (len_d - abs(count)) / 2*len_d`
             - Quadratic fn `2x**2` maps midpoint x=0.5 to y=0, and goes to y=1 at both ends
         """
+        if self.len_d <= 0:
+            """Every card is known: the next market card comes from a reshuffle"""
+            return 0.0
         return (abs(self.count) / self.len_d) ** 2
 
     def __repr__(self):
@@ -110,16 +246,37 @@ class Strategy:
         else:
             return f"S{self.player_id}: count:{self.count} C:{self.C:.4f}"
 
-    def __init__(self, player_id: int, hand: list[str], is_agent: bool, playing: bool):
-        self.A = 0.5  # TODO v2. more strategy profiles
-        self.L = 0.5  # TODO v2. more strategy profiles
+    def __init__(
+        self,
+        player_id: int,
+        hand: list[Card],
+        is_agent: bool,
+        playing: bool,
+        public: PublicCards | None = None,
+        profile: StrategyProfile = DEFAULT_PROFILE,
+    ):
+        self.profile = profile
+        self.A = profile.A
+        self.L = profile.L
+        self.open_threshold = profile.active_threshold(profile.open_threshold)
+        self.cash_threshold = profile.active_threshold(profile.cash_threshold)
 
         self.player_id = player_id
+        self.public = public if public is not None else PublicCards()
         self.update_state(hand, reset=True)
         self.is_agent = is_agent
         self.is_playing = playing
-        if is_agent and playing:
-            print_welcome()
+
+    def copy(self, public: PublicCards) -> "Strategy":
+        """
+        Same Strategy, subclasses included, knowing `public` and its own copy of
+        what only it has seen. Used to fork games, see `GameState.fork`
+        """
+        clone = object.__new__(type(self))
+        clone.__dict__ = self.__dict__.copy()
+        clone.public = public
+        clone.hand_kinds = self.hand_kinds.copy()
+        return clone
 
     def is_active(self, threshold: float = R()) -> bool:
         """
@@ -137,16 +294,15 @@ class Strategy:
             (no risk of being assigned a house trade), so efficient player will always
             take if possible. We need an additional eagerness to be a market maker
         """
-        # TODO fine tune threshold for auto strategies
         assert threshold >= 0 and threshold <= 1
         return threshold < self.C
 
     def compute_current_action(
         self,
-        hand: list[str],
-        Positions: list[Position],
+        hand: list[Card],
+        Positions: PositionBook,
         Chips: list[int],
-        Orderbook: dict[int, list[str]],
+        Orderbook: Orderbook,
         Blinds: int,
     ) -> bool:
         """
@@ -165,17 +321,15 @@ class Strategy:
         is_closing = self.compute_close_card_actions(Positions, Chips[self.player_id])
 
         """Should I open new positions"""
-        if not self.is_active(0.01):
+        if not self.is_active(self.open_threshold):
             return is_closing
 
         """I try to act if I can"""
-        is_opening = self.compute_open_card_action(Orderbook)
+        is_opening = self.compute_open_card_action(Orderbook, Positions)
 
         return is_closing or is_opening
 
-    def compute_close_card_actions(
-        self, Positions: list[Position], chips: int
-    ) -> tuple[list[str], bool]:
+    def compute_close_card_actions(self, Positions: PositionBook, chips: int) -> bool:
         """
         Returns bool is_acting, additionally:
 
@@ -183,106 +337,180 @@ class Strategy:
         so next computation (open_cards) does not take these cards into consideration
         """
         is_closing = False
-
-        for position in Positions:
-            has_player = position.has_player(self.player_id)
-            if (
-                has_player
-                and position.is_player_long(self.player_id) != self.expects_long
-            ):
-                """If I expect to be long, I should close all positions that are short"""
-
-                my_card = self.__get_closing_card()
-                if my_card:
-                    # TODO make sure the value of the card is valid to close the position
-                    # TODO may close position with more than one card
-                    self.close_cards[position] = my_card
-                    self.hand.remove(my_card)
+        payouts = None
+
+        for position in Positions.of_player(self.player_id):
+            if payouts is None:
+                payouts = self.payouts
+            if self.expected_payout(position, payouts) < 0:
+                """I should close the positions I expect to lose on"""
+
+                my_cards = closing_cards(self.hand, position, self.player_id)
+                if my_cards is not None:
+                    self.close_cards[position] = my_cards
+                    for card in my_cards:
+                        self.hand.remove(card)
                     is_closing = True
 
                 else:
-                    if self.is_active(0.1) and chips > get_close_cost(position):
+                    if (
+                        self.is_active(self.cash_threshold)
+                        and chips > get_close_cost(position)
+                    ):
                         """We can close with cash, and we have a high enough count"""
                         self.close_cards[position] = None
                         is_closing = True
 
         return is_closing
 
-    def compute_open_card_action(self, Orderbook: dict[int, list[str]]) -> bool:
+    def compute_open_card_action(
+        self, Orderbook: Orderbook, Positions: PositionBook
+    ) -> bool:
         """
         Returns bool is_acting.
-        We do only one open action, prefer being a market taker.
+        We do only one open action, prefer being a market taker, then doubling down.
         """
-        my_card = self.__get_card_match_expectation()
-        if not my_card:
+        my_card = self.__get_card_match_expectation(self.expects_long)
+        if my_card is None:
             """I have no card to act with"""
             return False
 
         """Try to find a suitable card in the orderbook"""
-        if card_to_take := self.__get_card_from_orderbook(Orderbook):
+        if order := self.__get_order_from_orderbook(Orderbook):
             """We are a taker: less risky"""
-            self.open_cards[my_card] = card_to_take
+            self.open_cards[my_card] = order
             return True
 
-        else:
-            # TODO if we have an open position on the same side:
-            # we prefer to double down (if doubling down increases payoff)
-            # rather than being a market maker
+        elif position := self.__get_double_down(my_card, Positions):
+            """We double down: it raises my payoff, no risk of a house trade"""
+            self.open_cards[my_card] = position
+            return True
 
-            if self.is_active(0.01):
+        else:
+            if self.is_active(self.open_threshold):
                 """We should be a market maker: riskier than being a taker"""
                 self.open_cards[my_card] = None
                 return True
             else:
                 return False
 
-    def __get_closing_card(self) -> str:
+    def set_actions(
+        self,
+        opens: list[tuple[Card, Card | None]],
+        closes: list[tuple[int, list[Card] | None]],
+        Positions: PositionBook,
+        Orderbook: Orderbook,
+        doubles: Iterable[tuple[Card, int]] = (),
+    ) -> bool:
         """
-        Returns card from the hand that can close a position, given an expectation.
-        Prefers any card before an Ace.
-        Returns empty string if no card found.
+        Sets actions decided outside of this class (by a client, a plugin)
+        as open_cards and close_cards, checking them against my hand, the orderbook
+        and my positions:
+        - opens: (card of my hand, card of the other colour to take or None to make)
+        - closes: (id of my position, cards of my hand or None to pay cash)
+        - doubles: (card of my hand, id of my position to double down on)
+        Raises ValueError on any illegal action. Returns bool is_acting
         """
-        my_card = self.__get_card_match_expectation()
-        if not my_card:
-            """Try to find an Ace"""
-            for card in self.hand:
-                if get_value(card) == 1:
-                    return card
-        return my_card
-
-    def __get_card_match_expectation(self) -> str:
-        """Returns a card from the hand that matches the expectation, empty string otherwise"""
+        self.open_cards = {}
+        self.close_cards = {}
+        hand = self.hand.copy()
+
+        def play(card: Card | None) -> Card:
+            if card not in hand:
+                raise ValueError(f"Card {card} is not in hand")
+            hand.remove(card)
+            return card
+
+        for card, order_card in opens:
+            card = play(card)
+            if order_card is None:
+                self.open_cards[card] = None
+                continue
+            order = Orderbook.get(order_card)
+            if (
+                order is None
+                or order.player_id == self.player_id
+                or LONGS[order.card] == LONGS[card]
+            ):
+                raise ValueError(f"No order of the other colour for {order_card}")
+            self.open_cards[card] = order
+
+        for card, position_id in doubles:
+            card = play(card)
+            position = Positions.get(position_id)
+            if position is None or not position.is_doubling(card, self.player_id):
+                raise ValueError(f"Card {card} can't double down on {position_id}")
+            self.open_cards[card] = position
+
+        for position_id, cards in closes:
+            position = Positions.get(position_id)
+            if position is None or not position.has_player(self.player_id):
+                raise ValueError(f"No position {position_id} of player")
+            if position in self.close_cards:
+                raise ValueError(f"Position {position_id} is closed twice")
+            if position in self.open_cards.values():
+                raise ValueError(f"Position {position_id} is doubled down and closed")
+            if cards is None:
+                self.close_cards[position] = None
+                continue
+            cards = [play(card) for card in cards]
+            if not is_closing(cards, position, self.player_id):
+                raise ValueError(f"Cards {cards} don't close position {position_id}")
+            self.close_cards[position] = cards
+
+        self.hand = hand
+        return bool(self.open_cards or self.close_cards)
+
+    def __get_card_match_expectation(self, is_long: bool) -> Card | None:
+        """Returns a card from the hand of the expected color, None otherwise"""
         for card in self.hand:
-            if is_long(card) == self.expects_long:
+            if LONGS[card] == is_long:
                 return card
-        return ""
+        return None
 
-    def __get_card_from_orderbook(self, Orderbook: dict[int, list[str]]) -> str:
+    def __get_double_down(self, card: Card, Positions: PositionBook) -> Position | None:
+        """
+        Returns my position on the card's side whose expected payout the card raises
+        the most, None if it raises none. Piles keep their value cached, the payout
+        delta of a candidate costs a lookup, see `Position.value_with`
+        """
+        payouts = self.payouts
+        sign = 1 if LONGS[card] else -1
+        side = Positions.long_of if LONGS[card] else Positions.short_of
+        best = None
+        best_delta = 0.0
+        for position in side(self.player_id):
+            if position in self.close_cards:
+                continue
+            size = size_of(position.value_with(card))
+            delta = sign * (payouts[size] - payouts[position.size])
+            if delta > best_delta:
+                best = position
+                best_delta = delta
+        return best
+
+    def __get_order_from_orderbook(self, Orderbook: Orderbook) -> Order | None:
         """
-        Returns a card from the Orderbook of the opposite expectation that I have,
-        concatenated with "_" + other_player_id.
-        Returns empty string otherwise.
+        Returns the best order from the Orderbook of the opposite expectation I have,
+        None otherwise. Never returns my own orders.
         """
-        for other_player_id in Orderbook:
-            for card in Orderbook[other_player_id]:
-                if is_long(card) != self.expects_long:
-                    return card + "_" + str(other_player_id)
-        return ""
+        return Orderbook.best(not self.expects_long, exclude=self.player_id)
 
 
 def ui_loop(
     self: Strategy,
-    Positions: list[Position],
+    Positions: PositionBook,
     Chips: list[int],
-    Orderbook: dict[int, list[str]],
+    Orderbook: Orderbook,
     Blinds: int,
 ) -> bool:
     """Helps user interact with the game, returns bool is_acting"""
     print(f"Your count is {self.count} with confidence {self.C:.4f}")
+    print(f"Odds of the next market card {self.odds}")
     print()
     print("Your info:")
-    print("  Hand", self.hand)
-    print("  Your Positions", [p for p in Positions if p.has_player(self.player_id)])
+    print("  Hand", cards_str(self.hand))
+    print("  Your Positions", list(Positions.of_player(self.player_id)))
     print("  Chips", Chips[self.player_id])
     print()
     print("Other info:")
@@ -302,10 +530,8 @@ def ui_loop(
                 print(f"Your count is {self.count} with confidence {self.C:.4f}")
                 print()
                 print("Your info:")
-                print("  Hand", self.hand)
-                print(
-                    "  Your Positions", [p for p in Positions if p.has_player(self.player_id)]
-                )
+                print("  Hand", cards_str(self.hand))
+                print("  Your Positions", list(Positions.of_player(self.player_id)))
                 print("  Chips", Chips[self.player_id])
                 print()
                 print("Other info:")
@@ -316,8 +542,8 @@ def ui_loop(
 
             case "review" | "r":
                 print("Pending actions this turn:")
-                print_open_cards()
-                print_close_cards()
+                print_open_cards(self.open_cards)
+                print_close_cards(self.close_cards)
                 print("")
                 print("To clear all action type rr, or reset")
 
@@ -329,14 +555,17 @@ def ui_loop(
 
             case "open" | "o":
                 print(">> Open a position")
-                if card := get_card(self.hand):
-                    flat_ob = reduce(lambda a, v: a + Orderbook[v], Orderbook, [])
+                if (card := get_card(self.hand)) is not None:
+                    flat_ob = [
+                        o.card for o in Orderbook if o.player_id != self.player_id
+                    ]
                     while True:
                         print("Will you be a market maker or a taker?")
                         print("  Type 'make' to propose the card to the orderbook")
-                        print(f"    the orderbook has {flat_ob} cards")
+                        print(f"    the orderbook has {cards_str(flat_ob)} cards")
                         print("  Type 'take' to open a position with an existing card")
-                        print(f"    you have {self.hand} cards")
+                        print(f"    you have {cards_str(self.hand)} cards")
+                        print("  Type 'double' to double down on one of your positions")
                         print("  Type 'back' or 'b' to go back")
                         print(">")
 
@@ -347,7 +576,19 @@ def ui_loop(
                             break
                         elif inp == "take":
                             other_card = get_card(flat_ob)
-                            self.open_cards[card] = other_card
+                            if other_card is None:
+                                continue
+                            self.open_cards[card] = Orderbook.get(other_card)
+                            is_acting = True
+                            break
+                        elif inp == "double":
+                            position = get_position(Positions)
+                            if position is None:
+                                continue
+                            if not position.is_doubling(card, self.player_id):
+                                print("  Double down on your own side of your position")
+                                continue
+                            self.open_cards[card] = position
                             is_acting = True
                             break
                         elif inp in ["back", "b"]:
@@ -363,9 +604,9 @@ def ui_loop(
                         print("  Type 'chip' to close the position with chips")
                         print(f"    you have {Chips[self.player_id]} chips")
                         print(
-                            "  Type 'card' to close the position with an existing card"
+                            "  Type 'card' to close the position with cards of your hand"
                         )
-                        print(f"    you have {self.hand} cards")
+                        print(f"    you have {cards_str(self.hand)} cards")
                         print("  Type 'back' or 'b' to go back")
                         print(">")
 
@@ -375,10 +616,18 @@ def ui_loop(
                             is_acting = True
                             break
                         elif inp == "card":
-                            card = get_card(self.hand)
-                            self.close_cards[position] = card
-                            is_acting = True
-                            break
+                            cards = []
+                            while not is_closing(cards, position, self.player_id):
+                                left = [c for c in self.hand if c not in cards]
+                                print(f"  Cards {cards_str(cards)} so far")
+                                card = get_card(left)
+                                if card is None:
+                                    break
+                                cards.append(card)
+                            else:
+                                self.close_cards[position] = cards
+                                is_acting = True
+                                break
                         elif inp in ["back", "b"]:
                             break
                         else:
@@ -413,119 +662,130 @@ def ui_loop(
     return is_acting
 
 
-def get_card(cards: list[str]) -> str | None:
+def get_card(cards: list[Card]) -> Card | None:
     """Prompts the user to choose a card from a list of possible cards"""
     if len(cards) == 0:
         print("You cannot do this, there's no available card")
         return
 
     while True:
-        print("Please select a card from one of the following", cards)
+        print("Please select a card from one of the following", cards_str(cards))
         print("  (type back or b to go back)")
         print(">")
         inp = input()
-        if inp in cards:
+        card = parse_card(inp)
+        if card in cards:
             print("selected", inp)
-            return inp
+            return card
         elif inp in ["back", "b"]:
             return
         else:
-            print(inp, "not in list of cards, select one of the following", cards)
+            print(inp, "not in list of cards, select one of the following")
+            print(" ", cards_str(cards))
 
 
-def get_position(Positions: list[Position]) -> Position | None:
-    """Prompts user to choose a position from a list of possible positions"""
+def get_position(Positions: PositionBook) -> Position | None:
+    """Prompts user to choose a position from the open positions"""
     if len(Positions) == 0:
         print("You cannot do this, there's no Position availabe")
         return
 
     while True:
-        print("Please select a position out of the following", Positions)
-        print("  By typing out the index number")
+        print("Please select a position out of the following")
+        for position in Positions:
+            print(f"  {position.id}: {position}")
+        print("  By typing out the position id")
         print("  (type back or b to go back)")
         print(">")
         inp = input()
+        if inp in ["back", "b"]:
+            return
         try:
-            id = int(inp)
-        except:
-            print("Please type a number smaller than", len(Positions))
+            position = Positions.get(int(inp))
+        except ValueError:
+            position = None
 
-        if id > 0 and id < len(Positions):
-            print("selected", Positions[id])
-            return Positions[id]
-        elif inp in ["back", "b"]:
-            return
+        if position:
+            print("selected", position)
+            return position
         else:
-            print("Please type a number smaller than", len(Positions))
+            print(inp, "is not the id of an open position")
 
 
-def print_open_cards(open_cards: dict[str, Position | str | None]):
+def print_open_cards(open_cards: dict[Card, Position | Order | None]):
     print("Open Actions:")
     for acts in open_cards:
-        if type(open_cards[acts]) == str:
+        if type(open_cards[acts]) == Order:
             print(
-                f"  Card {acts} opens new position against {open_cards[acts]} from orderbook"
+                f"  Card {card_str(acts)} opens new position against",
+                f"{open_cards[acts]} from orderbook",
             )
         elif type(open_cards[acts]) == Position:
-            print(f"  Card {acts} will double down to {open_cards[acts]}")
+            print(f"  Card {card_str(acts)} will double down to {open_cards[acts]}")
         else:
-            print(f"  Card {acts} opens to the orderbook")
+            print(f"  Card {card_str(acts)} opens to the orderbook")
 
 
-def print_close_cards(close_cards: dict[Position, str | None]):
+def print_close_cards(close_cards: dict[Position, list[Card] | None]):
     print("Close Actions:")
     for acts in close_cards:
-        if type(close_cards[acts]) == str:
-            print(f"  Position {acts} closes with {close_cards[acts]}")
+        if close_cards[acts] is not None:
+            print(f"  Position {acts} closes with {cards_str(close_cards[acts])}")
         else:
             print(f"  Position {acts} closes with {get_close_cost(acts)} chips")
 
 
+WELCOME = """\
+
+##################################################################
+
+  :####:                                 ##                     ##
+ :######     ##                          ##                     ##
+ ##:  :#     ##                          ##                     ##
+ ##        #######    .####.   ##.####   ##   ##:   :#####.     ##
+ ###:      #######   .######.  #######   ##  ##:   ########     ##
+ :#####:     ##      ###  ###  ###  :##  ##:##:    ##:  .:#     ##
+  .#####:    ##      ##.  .##  ##    ##  ####      ##### .      ##
+     :###    ##      ##    ##  ##    ##  #####     .######:     ##
+       ##    ##      ##.  .##  ##    ##  ##.###       .: ##       
+ #:.  :##    ##.     ###  ###  ##    ##  ##  ##:   #:.  :##       
+ #######:    #####   .######.  ##    ##  ##  :##   ########     ##
+ .#####:     .####    .####.   ##    ##  ##   ###  . ####       ##
+
+##################################################################
+
+You are playing Stonks! A card game inspired by poker and stock trading.
+
+If you have any doubts regarding the rules of the game, check:
+  https://github.com/ianmihura/stonks
+
+If you find a bug, email me at
+  mihura.ian@gmail.com
+
+*                                                         
+@                                                         
+@                                                ###      
+@                                            ######       
+@                                             ####        
+@                                          ###  #         
+@                                        ###              
+@                                      ###                
+@                                    ###                  
+@                                  ###                    
+@                     ##         ###                      
+@                   ##  ###    ###                        
+@      ##          ##      ####                           
+@    #####        ##                                      
+@   ##    ##     ##                                       
+@  ##       ##  ##                                        
+@ ##          ###                                         
+@                                                         
+@                                                         
+@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+"""
+"""Banner printed when an agent starts playing, see `print_welcome`"""
+
+
 def print_welcome():
-    print()
-    print("##################################################################")
-    print()
-    print("  :####:                                 ##                     ##")
-    print(" :######     ##                          ##                     ##")
-    print(" ##:  :#     ##                          ##                     ##")
-    print(" ##        #######    .####.   ##.####   ##   ##:   :#####.     ##")
-    print(" ###:      #######   .######.  #######   ##  ##:   ########     ##")
-    print(" :#####:     ##      ###  ###  ###  :##  ##:##:    ##:  .:#     ##")
-    print("  .#####:    ##      ##.  .##  ##    ##  ####      ##### .      ##")
-    print("     :###    ##      ##    ##  ##    ##  #####     .######:     ##")
-    print("       ##    ##      ##.  .##  ##    ##  ##.###       .: ##       ")
-    print(" #:.  :##    ##.     ###  ###  ##    ##  ##  ##:   #:.  :##       ")
-    print(" #######:    #####   .######.  ##    ##  ##  :##   ########     ##")
-    print(" .#####:     .####    .####.   ##    ##  ##   ###  . ####       ##")
-    print()
-    print("##################################################################")
-    print()
-    print("You are playing Stonks! A card game inspired by poker and stock trading.")
-    print()
-    print("If you have any doubts regarding the rules of the game, check:")
-    print("  https://github.com/ianmihura/stonks")
-    print()
-    print("If you find a bug, email me at")
-    print("  mihura.ian@gmail.com")
-    print()
-    print("*                                                         ")
-    print("@                                                         ")
-    print("@                                                ###      ")
-    print("@                                            ######       ")
-    print("@                                             ####        ")
-    print("@                                          ###  #         ")
-    print("@                                        ###              ")
-    print("@                                      ###                ")
-    print("@                                    ###                  ")
-    print("@                                  ###                    ")
-    print("@                     ##         ###                      ")
-    print("@                   ##  ###    ###                        ")
-    print("@      ##          ##      ####                           ")
-    print("@    #####        ##                                      ")
-    print("@   ##    ##     ##                                       ")
-    print("@  ##       ##  ##                                        ")
-    print("@ ##          ###                                         ")
-    print("@                                                         ")
-    print("@                                                         ")
-    print("@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@")
-    print()
+    sys.stdout.write(WELCOME)
@@ -0,0 +1,355 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import pi, sqrt
+from os import cpu_count
+from random import Random
+from statistics import NormalDist, mean, quantiles
+from typing import Iterator
+
+from atests import CHECK_SAMPLED
+from eventlog import EventLog
+from game import gameloop, new_game
+from strategy import StrategyProfile
+from tracing import TRACE_ACTION, TRACE_OFF, TRACE_SUMMARY
+
+
+class GameResult:
+    """Outcome of one seeded game, as streamed back by `run_games`"""
+
+    seed: int
+    Chips: list[int]
+    """Stack of chips per player_id (final state), the house is last"""
+    rounds: int
+    winner: int | None
+    """player_id of the last chipholder, None if everyone went broke"""
+    log: bytes | None
+    """Binary event log of the game, see eventlog. None unless asked for"""
+
+    def __repr__(self):
+        return f"[[seed:{self.seed}, rounds:{self.rounds}, winner:{self.winner}]]"
+
+    def __init__(
+        self, seed: int, Chips: list[int], rounds: int, log: bytes | None = None
+    ):
+        self.seed = seed
+        self.Chips = Chips
+        self.rounds = rounds
+        self.log = log
+        self.winner = None
+        for player_id, chips in enumerate(Chips[:-1]):
+            if chips > 0:
+                self.winner = player_id
+                break
+
+
+def play_seeded(
+    num_players: int,
+    init_chips: int,
+    seed: int,
+    check_level: int = CHECK_SAMPLED,
+    log_level: int = TRACE_OFF,
+    profiles: list[StrategyProfile] | None = None,
+) -> GameResult:
+    """Plays one headless game. Runs inside the pool's workers"""
+    log = EventLog(log_level) if log_level else None
+    state = new_game(
+        num_players,
+        init_chips,
+        False,
+        seed,
+        check_level,
+        tracer=log,
+        profiles=profiles,
+    )
+    Chips, rounds = gameloop(state)
+    return GameResult(seed, Chips, rounds, log.tobytes() if log else None)
+
+
+def game_seeds(master_seed: int, num_games: int) -> list[int]:
+    """
+    Derives one seed per game from the master seed.
+    The same master seed always yields the same games, whatever the number of workers.
+    """
+    rng = Random(master_seed)
+    return [rng.getrandbits(64) for _ in range(num_games)]
+
+
+def run_games(
+    num_players: int,
+    init_chips: int,
+    num_games: int,
+    master_seed: int = 0,
+    workers: int | None = None,
+    check_level: int = CHECK_SAMPLED,
+    log_level: int = TRACE_OFF,
+) -> Iterator[GameResult]:
+    """
+    Plays `num_games` seeded games across a pool of processes,
+    yields the GameResults in seed order, whatever the number of workers.
+
+    Only a few games per worker are in flight at any time,
+    so memory stays flat however many games are requested.
+    `workers=1` plays every game in this process.
+    Invariants are only sampled by default, see CHECK_* in atests.
+    With a `log_level`, each GameResult carries the binary event log of its game.
+    """
+    seeds = game_seeds(master_seed, num_games)
+    workers = workers or cpu_count() or 1
+
+    if workers == 1:
+        for seed in seeds:
+            yield play_seeded(num_players, init_chips, seed, check_level, log_level)
+        return
+
+    pool = ProcessPoolExecutor(workers)
+    wait = True
+    try:
+        pending = deque()
+        """Futures in seed order, a game done early waits for the ones before it"""
+        for seed in seeds:
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+            pending.append(
+                pool.submit(
+                    play_seeded, num_players, init_chips, seed, check_level, log_level
+                )
+            )
+        while pending:
+            yield pending.popleft().result()
+    except GeneratorExit:
+        """Closed early: the games in flight are cancelled or left to finish alone"""
+        wait = False
+        raise
+    finally:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class Summary:
+    """Running aggregates over GameResults, see `add`"""
+
+    num_players: int
+    games: int
+    wins: list[int]
+    """Games won per player_id"""
+    no_winner: int
+    """Games where every player went broke on the same round"""
+    rounds: list[int]
+    """Rounds played per game"""
+    Chips: list[list[int]]
+    """Final chips per player_id, one entry per game"""
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.games = 0
+        self.wins = [0] * num_players
+        self.no_winner = 0
+        self.rounds = []
+        self.Chips = [[] for _ in range(num_players)]
+
+    def add(self, result: GameResult):
+        self.games += 1
+        if result.winner is None:
+            self.no_winner += 1
+        else:
+            self.wins[result.winner] += 1
+        self.rounds.append(result.rounds)
+        for player_id in range(self.num_players):
+            self.Chips[player_id].append(result.Chips[player_id])
+
+    def win_rate(self, player_id: int) -> float:
+        """Estimated probability that the seat wins the game"""
+        return self.wins[player_id] / self.games if self.games else 0.0
+
+    def mean_rounds(self) -> float:
+        return mean(self.rounds) if self.rounds else 0.0
+
+    def round_quantiles(self, n: int = 4) -> list[float]:
+        """Cut points dividing the round counts in `n` groups, ie. quartiles"""
+        return quantiles(self.rounds, n=n) if len(self.rounds) > 1 else []
+
+    def chip_quantiles(self, player_id: int, n: int = 4) -> list[float]:
+        """Cut points dividing the final chips of a seat in `n` groups"""
+        chips = self.Chips[player_id]
+        return quantiles(chips, n=n) if len(chips) > 1 else []
+
+    def report(self) -> str:
+        lines = [
+            f"Games played {self.games}, no winner {self.no_winner}",
+            f"Rounds mean {self.mean_rounds():.1f}, quartiles {self.round_quantiles()}",
+        ]
+        for player_id in range(self.num_players):
+            lines.append(
+                f"  Player {player_id}: win rate {self.win_rate(player_id):.4f},"
+                f" chip quartiles {self.chip_quantiles(player_id)}"
+            )
+        return "\n".join(lines)
+
+
+def wilson_interval(successes: int, trials: int, z: float) -> tuple[float, float]:
+    """Wilson score interval of a binomial proportion, `z` standard deviations wide"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    z2 = z * z
+    center = (p + z2 / (2 * trials)) / (1 + z2 / trials)
+    half = z * sqrt(p * (1 - p) / trials + z2 / (4 * trials * trials))
+    half /= 1 + z2 / trials
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class StoppingRule:
+    """
+    Stops a tournament once the win rate of a seat is known precisely enough:
+    its confidence interval is at most `half_width` either side, or it excludes
+    `threshold` (the question asked is answered).
+
+    The interval is looked at again every time the games grow by LOOK_GROWTH.
+    Each look k spends alpha * 6 / (pi * k)^2 of the error rate, which sums to alpha
+    over any number of looks: the interval stays valid however late it stops.
+    """
+
+    LOOK_GROWTH = 1.5
+
+    player_id: int
+    half_width: float
+    confidence: float
+    threshold: float | None
+    looks: int
+    next_look: int
+    """Games played at the next look"""
+    interval: tuple[float, float]
+    """Confidence interval of the last look"""
+
+    def __repr__(self):
+        low, high = self.interval
+        return (
+            f"[[Seat {self.player_id} win rate in [{low:.4f}, {high:.4f}]"
+            f" at {self.confidence:.0%}, {self.looks} looks]]"
+        )
+
+    def __init__(
+        self,
+        player_id: int,
+        half_width: float,
+        confidence: float = 0.95,
+        threshold: float | None = None,
+        min_games: int = 100,
+    ):
+        self.player_id = player_id
+        self.half_width = half_width
+        self.confidence = confidence
+        self.threshold = threshold
+        self.looks = 0
+        self.next_look = min_games
+        self.interval = (0.0, 1.0)
+
+    def is_met(self, summary: Summary) -> bool:
+        if summary.games < self.next_look:
+            return False
+        self.looks += 1
+        self.next_look = int(summary.games * self.LOOK_GROWTH) + 1
+
+        alpha = (1 - self.confidence) * 6 / (pi * self.looks) ** 2
+        z = NormalDist().inv_cdf(1 - alpha / 2)
+        low, high = wilson_interval(summary.wins[self.player_id], summary.games, z)
+        self.interval = (low, high)
+        if high - low <= 2 * self.half_width:
+            return True
+        return self.threshold is not None and not low <= self.threshold <= high
+
+
+def run_tournament(
+    num_players: int,
+    init_chips: int,
+    num_games: int,
+    master_seed: int = 0,
+    workers: int | None = None,
+    check_level: int = CHECK_SAMPLED,
+    log_path: str | None = None,
+    stop: StoppingRule | None = None,
+    log_level: int = TRACE_ACTION,
+) -> Summary:
+    """
+    Plays `num_games` in parallel and aggregates them.
+    With `log_path`, the event log of every game is appended to that file,
+    TRACE_SUMMARY adds the per round summaries analytics.py reads.
+    With `stop`, `num_games` is a budget: no more games are scheduled once the rule
+    is met, the games still in flight are neither waited for nor counted.
+    """
+    summary = Summary(num_players)
+    log_file = open(log_path, "ab") if log_path else None
+    results = run_games(
+        num_players,
+        init_chips,
+        num_games,
+        master_seed,
+        workers,
+        check_level,
+        log_level if log_file else TRACE_OFF,
+    )
+    for result in results:
+        summary.add(result)
+        if log_file:
+            log_file.write(result.log)
+        if stop and stop.is_met(summary):
+            results.close()
+            break
+    if log_file:
+        log_file.close()
+    return summary
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Plays many headless games in parallel")
+    parser.add_argument("-p", "--players", type=int, default=5)
+    parser.add_argument("-c", "--chips", type=int, default=500)
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--check", type=int, default=CHECK_SAMPLED, help="see CHECK_* in atests"
+    )
+    parser.add_argument(
+        "--log", default=None, help="appends every game's event log to this file"
+    )
+    parser.add_argument(
+        "--summaries", action="store_true", help="logs the summaries for analytics"
+    )
+    parser.add_argument(
+        "--precision",
+        type=float,
+        default=None,
+        help="stops once the win rate of --seat is known to +- this",
+    )
+    parser.add_argument("--seat", type=int, default=0)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="also stops once the win rate is known above or below this",
+    )
+    args = parser.parse_args()
+
+    stop = None
+    if args.precision is not None or args.threshold is not None:
+        stop = StoppingRule(
+            args.seat, args.precision or 0.0, args.confidence, args.threshold
+        )
+
+    summary = run_tournament(
+        args.players,
+        args.chips,
+        args.games,
+        args.seed,
+        args.workers,
+        args.check,
+        args.log,
+        stop,
+        TRACE_SUMMARY if args.summaries else TRACE_ACTION,
+    )
+    print(summary.report())
+    if stop:
+        print(stop)
@@ -0,0 +1,267 @@
+import json
+import sys
+from typing import Callable, TextIO
+
+from card import CARDS
+
+
+TRACE_OFF = 0
+"""No tracing, headless runs do no work at all for it"""
+TRACE_GAME = 1
+"""Start and end of the game"""
+TRACE_ROUND = 2
+"""Once per round: round start, market card, bankruptcies"""
+TRACE_ACTION = 3
+"""Every card moved: deals, orders, positions. Enough to replay a game, see eventlog"""
+TRACE_SUMMARY = 4
+"""Per round summaries of what follows from the rules, for analytics. Opt-in logging"""
+TRACE_EVENT = 5
+"""Every event, plus what follows from the rules: blinds, payouts, house matches"""
+
+"""Events recorded from TRACE_GAME"""
+START = 0
+"""Game starts: `other` players, `value` init chips"""
+END = 1
+"""Game ends: `value` rounds played"""
+SEED = 15
+"""Part `other` of the game's seed: `value` holds SEED_BITS of it, lowest first"""
+SEED_BITS = 31
+SEED_MASK = (1 << SEED_BITS) - 1
+
+"""Events recorded from TRACE_ROUND"""
+ROUND = 2
+"""Round starts"""
+MARKET = 3
+"""Market card drawn: `card`"""
+BROKE = 4
+"""`player` went bankrupt"""
+
+"""Events recorded from TRACE_ACTION"""
+DEAL = 5
+"""`card` dealt to `player`"""
+POST = 7
+"""`player` posts `card` to the orderbook"""
+TAKE = 8
+"""`player` takes the order of `other` with `card`, `value` is the order's card"""
+CLOSE = 10
+"""
+`player` closes the position `value` with `card`.
+`card` is -1 when closing with cash, and `player` is -1 when closing a bankruptcy.
+Closing with several cards is one event per card, `other` counts the cards after it:
+the position is closed at the event where it is 0 (-1 in older logs)
+"""
+DOUBLE = 19
+"""`player` doubles down on the position `value` with `card`"""
+RESHUFFLE = 14
+"""The discarded pile is reshuffled into the deck, `value` cards"""
+
+"""Events recorded from TRACE_SUMMARY"""
+PNL = 16
+"""`player`'s chips changed by `value` this round, only if they changed"""
+POT = 17
+"""The blind pot of `value` is split between `other` players"""
+SETTLE = 18
+"""`other` positions were paid this round, `value` of them stonks. Only if any"""
+
+"""Events recorded from TRACE_EVENT"""
+BLIND = 6
+"""`player` pays a blind of `value`"""
+HOUSE = 9
+"""The house takes the order of `player`, its `card`"""
+PAYOUT = 11
+"""`other` pays `value` to `player`"""
+FEE = 12
+"""`player` pays a fee of `value` to the house"""
+BLINDS = 13
+"""`player` wins `value` from the blind pot"""
+
+EVENT_NAMES = [
+    "start",
+    "end",
+    "round",
+    "market",
+    "broke",
+    "deal",
+    "blind",
+    "post",
+    "take",
+    "house",
+    "close",
+    "payout",
+    "fee",
+    "blinds",
+    "reshuffle",
+    "seed",
+    "pnl",
+    "pot",
+    "settle",
+    "double",
+]
+"""Name per event kind"""
+
+Event = tuple[int, int, int, int, int, int]
+"""kind, round, player, other, card, value. -1 when the field does not apply"""
+
+Sink = Callable[[Event], None]
+
+
+class Tracer:
+    """
+    Records game events to sinks, up to a trace level.
+    Events are plain tuples of ints, only sinks format them (if they need to).
+
+    The engine guards every call with the level, so disabled events cost a comparison:
+
+        if tracer and tracer.level >= TRACE_ACTION:
+            tracer.emit(DEAL, state.current_round, player_id, card=card)
+    """
+
+    level: int
+    sinks: list[Sink]
+
+    def __repr__(self):
+        return f"[[Tracer level:{self.level}, sinks:{len(self.sinks)}]]"
+
+    def __init__(self, level: int = TRACE_EVENT, *sinks: Sink):
+        self.level = level
+        self.sinks = list(sinks)
+
+    def emit(
+        self,
+        kind: int,
+        round: int,
+        player: int = -1,
+        other: int = -1,
+        card: int = -1,
+        value: int = 0,
+    ):
+        event = (kind, round, player, other, card, value)
+        for sink in self.sinks:
+            sink(event)
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+def event_dict(event: Event) -> dict:
+    """Event as a dict, the card by name"""
+    kind, round, player, other, card, value = event
+    return {
+        "kind": EVENT_NAMES[kind],
+        "round": round,
+        "player": player,
+        "other": other,
+        "card": CARDS[card] if card >= 0 else None,
+        "value": value,
+    }
+
+
+EVENT_FORMATS = {
+    START: "Game of {other} players starts, {value} chips each",
+    END: "Game finished after {value} rounds",
+    ROUND: "Round {round}",
+    MARKET: "Market card {card}",
+    BROKE: "Player {player} is bankrupt",
+    DEAL: "  Player {player} is dealt {card}",
+    BLIND: "  Player {player} pays a blind of {value}",
+    POST: "  Player {player} posts {card}",
+    TAKE: "  Player {player} takes {order} from {other} with {card}",
+    HOUSE: "  House takes {card} from {player}",
+    CLOSE: "  Player {player} closes position {value} with {card}",
+    PAYOUT: "  Player {other} pays {value} to {player}",
+    FEE: "  Player {player} pays a fee of {value}",
+    BLINDS: "  Player {player} wins {value} from the blinds",
+    RESHUFFLE: "  Reshuffled {value} cards into the deck",
+    SEED: "Seed part {other}: {value}",
+    PNL: "  Player {player} made {value} this round",
+    POT: "  Blind pot of {value} split between {other} players",
+    SETTLE: "  {other} positions paid, {value} stonks",
+    DOUBLE: "  Player {player} doubles down on position {value} with {card}",
+}
+"""Human readable template per event kind, see `event_str`"""
+
+
+def event_str(event: Event) -> str:
+    """Human readable line for the event"""
+    kind, round, player, other, card, value = event
+    return EVENT_FORMATS[kind].format(
+        round=round,
+        player=player,
+        other=other,
+        card=CARDS[card] if card >= 0 else "cash",
+        value=value,
+        order=CARDS[value] if kind == TAKE else None,
+    )
+
+
+class TextSink:
+    """Writes events as human readable lines, ie. to the terminal"""
+
+    stream: TextIO
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, event: Event):
+        self.stream.write(event_str(event) + "\n")
+
+
+class JsonLinesSink:
+    """Writes events as JSON lines, one object per event"""
+
+    stream: TextIO
+    owned: bool
+    """Close the stream when the sink closes, if it opened the file"""
+
+    def __init__(self, path_or_stream: str | TextIO):
+        if isinstance(path_or_stream, str):
+            self.stream = open(path_or_stream, "w")
+            self.owned = True
+        else:
+            self.stream = path_or_stream
+            self.owned = False
+
+    def __call__(self, event: Event):
+        self.stream.write(json.dumps(event_dict(event)) + "\n")
+
+    def close(self):
+        if self.owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class ListSink(list):
+    """Keeps the events in memory, for tests and analysis"""
+
+    def __call__(self, event: Event):
+        self.append(event)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    from atests import CHECK_FULL
+    from game import gameloop, new_game
+
+    parser = ArgumentParser(description="Plays a seeded headless game, traces it")
+    parser.add_argument("-p", "--players", type=int, default=5)
+    parser.add_argument("-c", "--chips", type=int, default=500)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument(
+        "-l", "--level", type=int, default=TRACE_EVENT, help="see TRACE_* in tracing"
+    )
+    parser.add_argument(
+        "-o", "--output", default=None, help="JSON lines file, prints text if none"
+    )
+    args = parser.parse_args()
+
+    sink = JsonLinesSink(args.output) if args.output else TextSink()
+    tracer = Tracer(args.level, sink)
+    state = new_game(
+        args.players, args.chips, False, args.seed, CHECK_FULL, tracer=tracer
+    )
+    gameloop(state)
+    tracer.close()
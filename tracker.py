@@ -0,0 +1,54 @@
+from typing import Iterable
+
+from card import KINDS, LONGS, NUM_KINDS, Card
+
+
+class PublicCards:
+    """
+    Cards every player has seen since the last reshuffle: cards on the table,
+    cards revealed when opening or closing positions, and market cards.
+    Shared by all Strategies of a game and updated once per event,
+    each Strategy adds what only it knows (its hand) on top.
+    """
+
+    count: int
+    """
+    Count of color seen:
+    - Black +1
+    - Red -1
+    """
+
+    seen: int
+    """Number of cards seen"""
+
+    kinds: list[int]
+    """Number of cards seen per kind, see KINDS"""
+
+    def __repr__(self):
+        return f"[[Public count:{self.count}, seen:{self.seen}]]"
+
+    def __init__(self):
+        self.count = 0
+        self.seen = 0
+        self.kinds = [0] * NUM_KINDS
+
+    def copy(self) -> "PublicCards":
+        clone = PublicCards.__new__(PublicCards)
+        clone.count = self.count
+        clone.seen = self.seen
+        clone.kinds = self.kinds.copy()
+        return clone
+
+    def reveal(self, cards: Iterable[Card]):
+        kinds = self.kinds
+        for card in cards:
+            self.count += LONGS[card] or -1
+            self.seen += 1
+            kinds[KINDS[card]] += 1
+
+    def reset(self, cards: Iterable[Card] = ()):
+        """After a reshuffle, only the given cards (ie. on the table) are known"""
+        self.count = 0
+        self.seen = 0
+        self.kinds = [0] * NUM_KINDS
+        self.reveal(cards)
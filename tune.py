@@ -0,0 +1,216 @@
+"""
+Tunes StrategyProfiles: searches biases and thresholds by playing seeded games.
+
+Each candidate plays one seat against a reference field of default profiles,
+its seat moves with the seed so no seat is favoured. Every candidate plays the same
+seeds, so candidates are compared on the same deals.
+
+Successive halving spends the games on the promising candidates: every candidate
+plays a few games, the best 1/eta of them play eta times more, and so on until
+one is left.
+
+    python tune.py -p 4 -n 27 -g 20 --eta 3                 # random search
+    python tune.py -p 4 --grid L=0.3,0.5,0.7 A=0.3,0.5,0.7  # grid search
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from os import cpu_count
+from random import Random
+from typing import Callable, Iterator
+
+from atests import CHECK_OFF
+from strategy import DEFAULT_PROFILE, StrategyProfile
+from tournament import game_seeds, play_seeded
+
+SPACE: dict[str, tuple[float, float]] = {
+    "L": (0.0, 1.0),
+    "A": (0.05, 0.95),
+    "open_threshold": (0.0, 0.2),
+    "cash_threshold": (0.0, 0.5),
+}
+"""Range searched per StrategyProfile parameter"""
+
+
+def grid_profiles(grid: dict[str, list[float]]) -> list[StrategyProfile]:
+    """Every combination of the values, parameters not in `grid` keep their default"""
+    names = list(grid)
+    return [
+        StrategyProfile(**dict(zip(names, values)))
+        for values in product(*(grid[name] for name in names))
+    ]
+
+
+def random_profiles(
+    num_profiles: int, seed: int | None = 0, space: dict = SPACE
+) -> list[StrategyProfile]:
+    """Profiles drawn uniformly in `space`"""
+    rng = Random(seed)
+    return [
+        StrategyProfile(
+            **{name: rng.uniform(low, high) for name, (low, high) in space.items()}
+        )
+        for _ in range(num_profiles)
+    ]
+
+
+class Candidate:
+    """A profile under evaluation, and the games it played so far"""
+
+    profile: StrategyProfile
+    games: int
+    wins: int
+
+    def __repr__(self):
+        return f"{self.profile} wins:{self.wins}/{self.games}"
+
+    def __init__(self, profile: StrategyProfile):
+        self.profile = profile
+        self.games = 0
+        self.wins = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+def play_candidate(
+    profile: StrategyProfile,
+    field: list[StrategyProfile],
+    init_chips: int,
+    seed: int,
+    check_level: int = CHECK_OFF,
+) -> bool:
+    """Plays one game of `profile` against the field, returns whether it won"""
+    num_players = len(field) + 1
+    seat = seed % num_players
+    profiles = field[:seat] + [profile] + field[seat:]
+    result = play_seeded(num_players, init_chips, seed, check_level, profiles=profiles)
+    return result.winner == seat
+
+
+def play_rung(
+    pool: ProcessPoolExecutor | None,
+    workers: int,
+    candidates: list[Candidate],
+    field: list[StrategyProfile],
+    init_chips: int,
+    seeds: list[int],
+    check_level: int,
+) -> Iterator[tuple[Candidate, bool]]:
+    """Plays every candidate on every seed, in the pool if any"""
+    games = [(candidate, seed) for candidate in candidates for seed in seeds]
+    args = (
+        [candidate.profile for candidate, _ in games],
+        [field] * len(games),
+        [init_chips] * len(games),
+        [seed for _, seed in games],
+        [check_level] * len(games),
+    )
+    if pool is None:
+        won = map(play_candidate, *args)
+    else:
+        chunksize = max(1, len(games) // (workers * 4))
+        won = pool.map(play_candidate, *args, chunksize=chunksize)
+    for (candidate, _), is_win in zip(games, won):
+        yield candidate, is_win
+
+
+def successive_halving(
+    profiles: list[StrategyProfile],
+    num_players: int,
+    init_chips: int,
+    min_games: int = 20,
+    eta: int = 3,
+    master_seed: int = 0,
+    workers: int | None = None,
+    check_level: int = CHECK_OFF,
+    field: list[StrategyProfile] | None = None,
+    on_rung: Callable[[int, int], None] | None = None,
+) -> list[Candidate]:
+    """
+    Evaluates the profiles with successive halving, each rung in parallel.
+    Returns every candidate, the ones that went furthest first, best win rate first.
+    Survivors keep the games of the previous rungs and play the next seeds,
+    until one is left. `on_rung` is called with the candidates and games of each rung.
+    """
+    field = field or [DEFAULT_PROFILE] * (num_players - 1)
+    candidates = [Candidate(profile) for profile in profiles]
+    alive = candidates
+    target = min_games
+    rungs = 1
+    while len(alive) // eta**rungs > 0:
+        rungs += 1
+    seeds = game_seeds(master_seed, min_games * eta ** (rungs - 1))
+    workers = workers or cpu_count() or 1
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        while True:
+            rung_seeds = seeds[alive[0].games : target]
+            for candidate, is_win in play_rung(
+                pool, workers, alive, field, init_chips, rung_seeds, check_level
+            ):
+                candidate.games += 1
+                candidate.wins += is_win
+            if on_rung:
+                on_rung(len(alive), target)
+            alive = sorted(alive, key=lambda c: c.win_rate, reverse=True)
+            alive = alive[: max(1, len(alive) // eta)]
+            if len(alive) == 1:
+                break
+            target *= eta
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return sorted(candidates, key=lambda c: (c.games, c.win_rate), reverse=True)
+
+
+def parse_grid(specs: list[str]) -> dict[str, list[float]]:
+    """Parses name=v1,v2,... specs"""
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=")
+        if name not in SPACE:
+            raise ValueError(f"Unknown profile parameter {name}, see SPACE")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Searches Strategy profiles")
+    parser.add_argument("-p", "--players", type=int, default=4)
+    parser.add_argument("-c", "--chips", type=int, default=100)
+    parser.add_argument("-n", "--candidates", type=int, default=27, help="random")
+    parser.add_argument("--grid", nargs="*", default=None, help="name=v1,v2,...")
+    parser.add_argument("-g", "--games", type=int, default=20, help="first rung")
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--check", type=int, default=CHECK_OFF, help="see CHECK_* in atests"
+    )
+    args = parser.parse_args()
+
+    if args.grid:
+        profiles = grid_profiles(parse_grid(args.grid))
+    else:
+        profiles = random_profiles(args.candidates, args.seed)
+
+    ranked = successive_halving(
+        profiles,
+        args.players,
+        args.chips,
+        args.games,
+        args.eta,
+        args.seed,
+        args.workers,
+        args.check,
+        on_rung=lambda alive, games: print(f"{alive} candidates played {games} games"),
+    )
+    print(f"Field win rate {1 / args.players:.3f}")
+    for candidate in ranked[:5]:
+        print(f"  {candidate.win_rate:.3f} {candidate}")